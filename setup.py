@@ -31,11 +31,14 @@ setup(
         'Natural Language :: English',
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Topic :: Software Development :: Build Tools',
         ],
     keywords='common tools utility',
     packages=find_packages(exclude=['docs', 'tests*']),
+    python_requires='>=3.9',
     install_requires=[
         'chromalog',
         'matplotlib',
@@ -45,6 +48,9 @@ setup(
         'pytest',
         'wrapt',
         ],
+    extras_require={
+        'zstd': ['zstandard'],
+        },
     package_dir={'strumenti': 'strumenti'},
     include_package_data=True,
     )
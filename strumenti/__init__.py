@@ -4,6 +4,7 @@
 from pkg_resources import get_distribution, DistributionNotFound
 import os.path as osp
 
+from . import benchmark
 from . import coordinate
 from . import notify
 from . import packages
@@ -0,0 +1,238 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark Module
+
+Functions for measuring the performance of the system input and output \
+functions and detecting regressions against a saved baseline.
+
+.. moduleauthor:: Timothy Helton <timothy.j.helton@gmail.com>
+"""
+
+import json
+import os
+import os.path as osp
+import platform
+import shutil
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+from strumenti import system
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: float=0.1) -> List[str]:
+    """Return descriptions of benchmarks that regressed against a baseline.
+
+    .. note:: A regression is a drop in throughput or a rise in peak memory \
+        larger than the threshold fraction of the baseline value.
+
+    :param dict results: current benchmark results
+    :param dict baseline: benchmark results to compare against
+    :param float threshold: allowed fractional change (default: 0.1)
+    :returns: description of each regression
+    :rtype: list
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous:
+            continue
+
+        for key in ('mb_per_s', 'rows_per_s'):
+            if previous.get(key) and current.get(key) is not None:
+                change = current[key] / previous[key] - 1
+                if change < -threshold:
+                    regressions.append('{}: {} {:.3g} -> {:.3g} ({:+.1%})'
+                                       .format(name, key, previous[key],
+                                               current[key], change))
+
+        if previous.get('peak_bytes') and current.get('peak_bytes'):
+            change = current['peak_bytes'] / previous['peak_bytes'] - 1
+            if change > threshold:
+                regressions.append('{}: peak_bytes {} -> {} ({:+.1%})'
+                                   .format(name, previous['peak_bytes'],
+                                           current['peak_bytes'], change))
+
+    return regressions
+
+
+def generate_data(path: str, rows: int=100000, cols: int=8, files: int=1,
+                  depth: int=0, seed: int=0) -> List[str]:
+    """Write synthetic whitespace delimited data files with a header row.
+
+    .. note:: Files are spread round robin over a chain of nested \
+        directories "depth" levels deep below argument "path".
+
+    :param str path: directory to hold the data files
+    :param int rows: number of data rows in each file (default: 100000)
+    :param int cols: number of columns in each file (default: 8)
+    :param int files: number of files to write (default: 1)
+    :param int depth: number of nested directory levels (default: 0)
+    :param int seed: seed for the random number generator (default: 0)
+    :returns: paths to the data files
+    :rtype: list
+    """
+    rng = np.random.RandomState(seed)
+    dirs = [path]
+    for level in range(depth):
+        dirs.append(osp.join(dirs[-1], 'level_{}'.format(level)))
+    for directory in dirs:
+        os.makedirs(directory, exist_ok=True)
+
+    header = ' '.join('c{}'.format(x) for x in range(cols))
+    paths = []
+    for idx in range(files):
+        file_path = osp.join(dirs[idx % len(dirs)],
+                             'bench_{}.txt'.format(idx))
+        np.savetxt(file_path, rng.standard_normal((rows, cols)), fmt='%.6f',
+                   header=header, comments='')
+        paths.append(file_path)
+
+    return paths
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    """Load benchmark results saved with :func:`save_baseline`.
+
+    :param str path: path to JSON baseline file
+    :returns: benchmark results
+    :rtype: dict
+    """
+    with open(path, 'r') as f:
+        return json.load(f)['results']
+
+
+def measure(func: Callable, *args, size_bytes: Union[int, None]=None,
+            rows: Union[int, None]=None, repeat: int=3,
+            setup: Union[Callable, None]=None, **kwargs) -> Dict[str, Any]:
+    """Measure the run time, throughput and peak memory of a function.
+
+    .. note:: The fastest of "repeat" runs is reported. Peak memory is \
+        measured with tracemalloc during a separate run so tracing does \
+        not distort the timing.
+
+    :param func: function to measure
+    :type: function
+    :param args: positional arguments passed to func
+    :param int size_bytes: number of bytes processed by each call \
+        (default: None will not report MB/s)
+    :param int rows: number of rows processed by each call (default: None \
+        will not report rows/s)
+    :param int repeat: number of timed runs (default: 3)
+    :param setup: function called before every run (default: None)
+    :type: function or None
+    :param kwargs: keyword arguments passed to func
+    :returns: seconds, mb_per_s, rows_per_s and peak_bytes
+    :rtype: dict
+    """
+    times = []
+    for _ in range(max(int(repeat), 1)):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    seconds = max(min(times), 1e-9)
+    mb_per_s = size_bytes / 1e6 / seconds if size_bytes is not None else None
+    rows_per_s = rows / seconds if rows is not None else None
+    return {'seconds': seconds, 'mb_per_s': mb_per_s,
+            'rows_per_s': rows_per_s, 'peak_bytes': peak}
+
+
+def run_suite(path: str, rows: int=100000, cols: int=8, files: int=10,
+              depth: int=2, repeat: int=3) -> Dict[str, dict]:
+    """Benchmark the system input and output functions on synthetic data.
+
+    :param str path: working directory for the synthetic data, which is \
+        removed after the benchmarks
+    :param int rows: number of data rows in each file (default: 100000)
+    :param int cols: number of columns in each file (default: 8)
+    :param int files: number of files used by walk_dir (default: 10)
+    :param int depth: number of nested directory levels (default: 2)
+    :param int repeat: number of timed runs of each benchmark (default: 3)
+    :returns: results of each benchmark
+    :rtype: dict
+
+    **Example**:
+
+        * Compare a run against a saved baseline.
+
+    ::
+
+        from strumenti import benchmark
+
+        results = benchmark.run_suite('bench_data')
+        for line in benchmark.compare(results,
+                                      benchmark.load_baseline('base.json')):
+            print(line)
+    """
+    os.makedirs(path, exist_ok=True)
+    try:
+        paths = generate_data(path, rows=rows, cols=cols, files=files,
+                              depth=depth)
+        data = paths[0]
+        size = osp.getsize(data)
+        results = {
+            'load_file': measure(system.load_file, data, size_bytes=size,
+                                 rows=rows + 1, repeat=repeat),
+            'load_records': measure(system.load_records, data, header_row=0,
+                                    skip_rows=1, size_bytes=size, rows=rows,
+                                    repeat=repeat),
+            'get_header': measure(system.get_header, data, repeat=repeat),
+            }
+
+        zipped = '{}.gz'.format(data)
+
+        def unzipped():
+            if osp.isfile(zipped):
+                system.unzip_file(zipped)
+
+        def zipped_copy():
+            if not osp.isfile(zipped):
+                system.zip_file(data)
+
+        results['zip_file'] = measure(system.zip_file, data,
+                                      size_bytes=size, repeat=repeat,
+                                      setup=unzipped)
+        results['unzip_file'] = measure(system.unzip_file, zipped,
+                                        size_bytes=size, repeat=repeat,
+                                        setup=zipped_copy)
+
+        walk = system.preserve_cwd(path)(system.walk_dir)
+        results['walk_dir'] = measure(walk, 'bench_', rows=len(paths),
+                                      repeat=repeat)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    return results
+
+
+def save_baseline(results: Dict[str, dict], path: str):
+    """Save benchmark results and the platform description to a JSON file.
+
+    :param dict results: benchmark results
+    :param str path: path to JSON baseline file
+    """
+    with open(path, 'w') as f:
+        json.dump({'platform': platform.platform(),
+                   'python': platform.python_version(),
+                   'numpy': np.__version__,
+                   'results': results}, f, indent=2, sort_keys=True)
@@ -8,20 +8,301 @@ Functions for performing tasks related to the operating system.
 .. moduleauthor:: Timothy Helton <timothy.j.helton@gmail.com>
 """
 
+import atexit
+import bz2
+import collections
+from concurrent import futures
 import datetime as dt
+import fnmatch
+import functools
 import gzip
+import hashlib
+import itertools
+import json
 import logging
+import logging.handlers
+import lzma
+import math
+import mmap
 import os
+import queue
+import re
 import shutil
-from typing import Any, List, Tuple, Union
+import sqlite3
+import threading
+import time
+import tracemalloc
+import zlib
+from typing import Any, Callable, IO, Iterator, List, Tuple, Union
 
 import chromalog
 import numpy as np
 import wrapt
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 from strumenti import notify
 
 
+Codec = collections.namedtuple('Codec', ['extension', 'magic', 'level',
+                                         'reader', 'writer', 'compress'])
+
+CODECS = collections.OrderedDict([
+    ('gzip', Codec('.gz', re.compile(re.escape(b'\x1f\x8b')), 9, gzip.open,
+                   lambda path, level: gzip.open(path, 'wb',
+                                                 compresslevel=level),
+                   lambda data, level: gzip.compress(data, level))),
+    ('bz2', Codec('.bz2', re.compile(b'BZh[1-9](1AY&SY|\x17rE8P\x90)'), 9,
+                  bz2.open,
+                  lambda path, level: bz2.open(path, 'wb',
+                                               compresslevel=level),
+                  lambda data, level: bz2.compress(data, level))),
+    ('lzma', Codec('.xz', re.compile(re.escape(b'\xfd7zXZ\x00')), 6, lzma.open,
+                   lambda path, level: lzma.open(path, 'wb', preset=level),
+                   lambda data, level: lzma.compress(data, preset=level))),
+    ])
+if zstandard is not None:
+    CODECS['zstd'] = Codec(
+        '.zst', re.compile(re.escape(b'\x28\xb5\x2f\xfd')), 3, zstandard.open,
+        lambda path, level: zstandard.open(
+            path, 'wb', cctx=zstandard.ZstdCompressor(level=level)),
+        lambda data, level: zstandard.ZstdCompressor(level=level)
+        .compress(data))
+Match = collections.namedtuple('Match', ['path', 'line', 'offset'])
+
+RECORDS_META = 'records.json'
+
+ZipSummary = collections.namedtuple('ZipSummary', ['path', 'bytes_in',
+                                                   'bytes_out', 'seconds',
+                                                   'skipped'])
+
+
+class CallRegistry:
+    """Process-wide statistics of calls to decorated functions.
+
+    .. note:: Run times are recorded by :func:`status` and allocated \
+        memory by :func:`memory_status`. Run times are kept in a streaming \
+        histogram of 16 logarithmic buckets per power of two nanoseconds, \
+        so percentiles are reported within about 3% and memory does not \
+        grow with the number of calls.
+
+    :Attributes:
+
+        - **enabled**: *bool* record calls if True; decorators created \
+            with argument "enabled=None" skip all work while False
+
+    **Example**:
+
+        * Time a function and print a report.
+
+    ::
+
+        @status(timing=True, verbose=False)
+        def solve(x):
+            ...
+
+        for x in range(1000):
+            solve(x)
+        print(CALL_REGISTRY.report())
+    """
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._timing = {}
+
+    def __repr__(self):
+        return 'CallRegistry(functions={})'.format(
+            len(set(self._timing) | set(self._memory)))
+
+    @staticmethod
+    def _bucket(value: int) -> int:
+        """Return the histogram bucket of a value.
+
+        :param int value: non-negative value
+        :returns: bucket index
+        :rtype: int
+        """
+        shift = max(value.bit_length() - 5, 0)
+        return (shift << 4) + (value >> shift)
+
+    @staticmethod
+    def _bucket_value(bucket: int) -> int:
+        """Return the midpoint of a histogram bucket.
+
+        :param int bucket: bucket index
+        :returns: midpoint value
+        :rtype: int
+        """
+        if bucket < 32:
+            return bucket
+        shift = (bucket >> 4) - 1
+        return (((bucket & 15) + 16) << shift) + (1 << shift >> 1)
+
+    def add_memory(self, name: str, peak: int, net: int,
+                   sites: List[Tuple[str, int]]):
+        """Record the memory allocated by a call.
+
+        :param str name: name of the function
+        :param int peak: peak traced bytes above the start of the call
+        :param int net: traced bytes at the end minus the start of the call
+        :param list sites: allocation site and bytes allocated there
+        """
+        with self._lock:
+            entry = self._memory.get(name)
+            if entry is None:
+                entry = self._memory[name] = {
+                    'count': 0, 'peak_max': peak, 'peak_total': 0,
+                    'net_max': net, 'net_total': 0,
+                    'sites': collections.Counter()}
+            entry['count'] += 1
+            entry['peak_max'] = max(entry['peak_max'], peak)
+            entry['peak_total'] += peak
+            entry['net_max'] = max(entry['net_max'], net)
+            entry['net_total'] += net
+            for site, size in sites:
+                entry['sites'][site] += size
+
+    def add_time(self, name: str, nanoseconds: int):
+        """Record the run time of a call.
+
+        :param str name: name of the function
+        :param int nanoseconds: run time of the call
+        """
+        with self._lock:
+            entry = self._timing.get(name)
+            if entry is None:
+                entry = self._timing[name] = {
+                    'count': 0, 'total': 0, 'min': nanoseconds,
+                    'max': nanoseconds,
+                    'buckets': collections.Counter()}
+            entry['count'] += 1
+            entry['total'] += nanoseconds
+            entry['min'] = min(entry['min'], nanoseconds)
+            entry['max'] = max(entry['max'], nanoseconds)
+            entry['buckets'][self._bucket(nanoseconds)] += 1
+
+    def clear(self):
+        """Remove all recorded calls."""
+        with self._lock:
+            self._memory.clear()
+            self._timing.clear()
+
+    def report(self, fmt: str='table') -> str:
+        """Return a report of the recorded calls.
+
+        :param str fmt: 'table' for aligned text with times in \
+            microseconds and memory in kB or 'json' for the output of \
+            :meth:`stats` (default: 'table')
+        :returns: report, which is empty if no calls were recorded
+        :rtype: str
+        """
+        stats = self.stats()
+        if fmt == 'json':
+            return json.dumps(stats, indent=2, sort_keys=True)
+        if fmt != 'table':
+            raise ValueError("fmt must be 'table' or 'json'.")
+
+        keys = ('count', 'total_ns', 'min_ns', 'p50_ns', 'p95_ns', 'p99_ns',
+                'max_ns')
+        header = ('function', 'calls', 'total us', 'min us', 'p50 us',
+                  'p95 us', 'p99 us', 'max us')
+        rows = [[name, str(entry['timing']['count'])] +
+                ['{:.1f}'.format(entry['timing'][x] / 1e3) for x in keys[1:]]
+                for name, entry in sorted(stats.items())
+                if 'timing' in entry]
+        tables = [self._table(header, rows)] if rows else []
+
+        keys = ('count', 'peak_max_bytes', 'peak_mean_bytes',
+                'net_max_bytes', 'net_total_bytes')
+        header = ('function', 'calls', 'peak max kB', 'peak mean kB',
+                  'net max kB', 'net total kB', 'top site')
+        rows = [[name, str(entry['memory']['count'])] +
+                ['{:.1f}'.format(entry['memory'][x] / 1e3) for x in keys[1:]] +
+                [entry['memory']['top_sites'][0][0]
+                 if entry['memory']['top_sites'] else '']
+                for name, entry in sorted(stats.items())
+                if 'memory' in entry]
+        if rows:
+            tables.append(self._table(header, rows))
+        return '\n\n'.join(tables)
+
+    def stats(self) -> dict:
+        """Return the statistics of every recorded function.
+
+        :returns: statistics keyed by function name; run times under key \
+            "timing" hold count, total_ns, min_ns, max_ns, p50_ns, p95_ns \
+            and p99_ns; allocated memory under key "memory" holds count, \
+            peak_max_bytes, peak_mean_bytes, net_max_bytes, \
+            net_total_bytes and top_sites, the ten sites that allocated the \
+            most bytes over all calls
+        :rtype: dict
+        """
+        stats = {}
+        with self._lock:
+            for name, entry in self._memory.items():
+                stats[name] = {'memory': {
+                    'count': entry['count'],
+                    'peak_max_bytes': entry['peak_max'],
+                    'peak_mean_bytes': entry['peak_total'] // entry['count'],
+                    'net_max_bytes': entry['net_max'],
+                    'net_total_bytes': entry['net_total'],
+                    'top_sites': [list(x) for x in
+                                  entry['sites'].most_common(10)]}}
+            for name, entry in self._timing.items():
+                timing = {'count': entry['count'],
+                          'total_ns': entry['total'],
+                          'min_ns': entry['min'],
+                          'max_ns': entry['max']}
+                for quantile in (50, 95, 99):
+                    timing['p{}_ns'.format(quantile)] = min(max(
+                        self._percentile(entry, quantile), entry['min']),
+                        entry['max'])
+                stats.setdefault(name, {})['timing'] = timing
+        return stats
+
+    @staticmethod
+    def _table(header: Tuple[str], rows: List[List[str]]) -> str:
+        """Return rows of text aligned in columns.
+
+        :param tuple header: column titles
+        :param list rows: cells of each row
+        :returns: first column left aligned and other columns right aligned
+        :rtype: str
+        """
+        widths = [max(len(x) for x in column) for column in
+                  zip(header, *rows)]
+        return '\n'.join('  '.join(x.ljust(widths[0]) if idx == 0 else
+                                   x.rjust(widths[idx])
+                                   for idx, x in enumerate(row)).rstrip()
+                         for row in [header] + rows)
+
+    def _percentile(self, entry: dict, quantile: float) -> int:
+        """Return a percentile of the run times in a histogram.
+
+        :param dict entry: statistics of one function
+        :param float quantile: percentile between 0 and 100
+        :returns: estimated run time in nanoseconds
+        :rtype: int
+        """
+        rank = quantile / 100 * entry['count']
+        seen = 0
+        for bucket in sorted(entry['buckets']):
+            seen += entry['buckets'][bucket]
+            if seen >= rank:
+                return self._bucket_value(bucket)
+        return entry['max']
+
+
+CALL_REGISTRY = CallRegistry()
+_MEMORY_CALLS = []
+_MEMORY_LOCK = threading.Lock()
+_MEMORY_TRACING = {'started': False}
+
+
 def check_list(variable: Union[str, Tuple[Any], List[Any]]) -> list:
     """Convert argument variable into a list.
 
@@ -37,11 +318,520 @@ def check_list(variable: Union[str, Tuple[Any], List[Any]]) -> list:
     return variable
 
 
+class FileIndex:
+    """Persistent index of the files below a directory.
+
+    The path, size and modification time of every file are stored in a \
+    SQLite database. A refresh only lists directories whose modification \
+    time changed since the previous refresh, and searches are answered \
+    from the database without walking the tree.
+
+    .. note:: As with :func:`scan_dir`, symbolic links to directories are \
+        neither indexed nor followed.
+
+    .. note:: A directory's modification time changes when entries are \
+        added, removed or renamed, but not when an existing file is \
+        rewritten. Sizes and times of rewritten files are updated when \
+        their directory is next rescanned or by refresh(full=True).
+
+    :param str path: root directory of the index (default: None will use \
+        the current directory)
+    :param str index_path: path to the database file (default: None will \
+        use the root directory path with suffix .index.sqlite)
+
+    :Attributes:
+
+        - **index_path**: *str* path to the database file
+        - **path**: *str* absolute path to the root directory
+
+    **Example**:
+
+        * Update the index and find the result files of every run.
+
+    ::
+
+        index = FileIndex('runs')
+        index.refresh()
+        paths = index.search('result', suffix='.txt')
+    """
+    def __init__(self, path: Union[str, None]=None,
+                 index_path: Union[str, None]=None):
+        self.path = os.path.abspath(os.getcwd() if path is None else path)
+        self.index_path = (index_path if index_path else
+                           '{}.index.sqlite'.format(self.path))
+        self._db = sqlite3.connect(self.index_path)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS dirs '
+                             '(path TEXT PRIMARY KEY, parent TEXT, '
+                             'mtime INTEGER)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS files '
+                             '(dir TEXT, name TEXT, size INTEGER, '
+                             'mtime REAL, PRIMARY KEY (dir, name))')
+
+    def __repr__(self):
+        return 'FileIndex(path={!r}, index_path={!r})'.format(self.path,
+                                                             self.index_path)
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._db.close()
+
+    def refresh(self, full: bool=False) -> int:
+        """Bring the index up to date with the directory tree.
+
+        :param bool full: rescan every directory (default: False)
+        :returns: number of directories rescanned
+        :rtype: int
+        """
+        stored = {x[0]: x[1] for x in
+                  self._db.execute('SELECT path, mtime FROM dirs')}
+        children = collections.defaultdict(list)
+        for directory, parent in self._db.execute(
+                'SELECT path, parent FROM dirs'):
+            children[parent].append(directory)
+
+        seen = set()
+        rescanned = 0
+        pending = [self.path]
+        with self._db:
+            while pending:
+                directory = pending.pop()
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(directory)
+
+                if not full and stored.get(directory) == mtime:
+                    pending.extend(children[directory])
+                    continue
+
+                rescanned += 1
+                files = []
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            try:
+                                if entry.is_dir():
+                                    if not entry.is_symlink():
+                                        pending.append(entry.path)
+                                    continue
+                                try:
+                                    stat = entry.stat()
+                                except OSError:
+                                    stat = entry.stat(follow_symlinks=False)
+                                files.append((directory, entry.name,
+                                              stat.st_size, stat.st_mtime))
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+
+                self._db.execute('DELETE FROM files WHERE dir = ?',
+                                 (directory, ))
+                self._db.executemany('INSERT INTO files VALUES (?, ?, ?, ?)',
+                                     files)
+                parent = (None if directory == self.path else
+                          os.path.dirname(directory))
+                self._db.execute('INSERT OR REPLACE INTO dirs '
+                                 'VALUES (?, ?, ?)',
+                                 (directory, parent, mtime))
+
+            removed = [(x, ) for x in set(stored) - seen]
+            self._db.executemany('DELETE FROM dirs WHERE path = ?', removed)
+            self._db.executemany('DELETE FROM files WHERE dir = ?', removed)
+
+        return rescanned
+
+    def search(self, search: str='', suffix: Union[str, None]=None,
+               pattern: Union[str, None]=None,
+               min_size: Union[int, None]=None,
+               max_size: Union[int, None]=None,
+               newer: Union[float, None]=None,
+               older: Union[float, None]=None) -> List[str]:
+        """Return indexed files that satisfy every filter.
+
+        :param str search: string of characters the file names must \
+            contain (default: '' will match all files)
+        :param str suffix: ending of the file names (default: None)
+        :param str pattern: glob pattern the file names must match \
+            (default: None)
+        :param int min_size: minimum file size in bytes (default: None)
+        :param int max_size: maximum file size in bytes (default: None)
+        :param float newer: files must be modified at or after this epoch \
+            time (default: None)
+        :param float older: files must be modified at or before this epoch \
+            time (default: None)
+        :returns: sorted paths to matching files
+        :rtype: list
+        """
+        filters = (('instr(name, ?) > 0', search or None),
+                   ('substr(name, -length(?)) = ?',
+                    (suffix, suffix) if suffix else None),
+                   ('name GLOB ?', pattern),
+                   ('size >= ?', min_size),
+                   ('size <= ?', max_size),
+                   ('mtime >= ?', newer),
+                   ('mtime <= ?', older))
+        clauses = ['1']
+        values = []
+        for clause, value in filters:
+            if value is not None:
+                clauses.append(clause)
+                values.extend(value if isinstance(value, tuple) else [value])
+
+        query = 'SELECT dir, name FROM files WHERE {}'.format(
+            ' AND '.join(clauses))
+        return sorted(os.path.join(directory, name)
+                      for directory, name in self._db.execute(query, values))
+
+
+def find_duplicates(path: Union[str, None]=None, search: str='',
+                    min_size: int=1, block_size: int=2 ** 16,
+                    cache: Union[str, None]=None,
+                    workers: Union[int, None]=None) -> List[List[str]]:
+    """Find groups of files below a directory with identical content.
+
+    .. note:: Files are compared in stages and a file leaves the search as \
+        soon as it is unique: first by size, then by a hash of the first \
+        and last blocks, and finally by a hash of the full content \
+        computed on a process pool. Files no longer than two blocks are \
+        fully covered by the second stage.
+
+    .. note:: If argument "cache" is supplied, hashes are stored with the \
+        size and modification time of each file and reused on later calls \
+        while both are unchanged. Entries of files outside this search are \
+        kept unless the file was removed or changed.
+
+    :param str path: directory to search (default: None will use the \
+        current directory)
+    :param str search: string of characters the file names must contain \
+        (default: '' will match all files)
+    :param int min_size: minimum file size in bytes (default: 1 will skip \
+        empty files)
+    :param int block_size: number of bytes hashed at each end of a file in \
+        the second stage (default: 64 kB)
+    :param str cache: path to JSON hash cache (default: None will not \
+        cache hashes)
+    :param int workers: number of processes hashing full content \
+        (default: None will use the executor default)
+    :returns: sorted groups of two or more absolute paths with identical \
+        content
+    :rtype: list
+
+    **Example**:
+
+        * Report duplicated result files and the space they waste.
+
+    ::
+
+        for group in find_duplicates('results', cache='hashes.json'):
+            print(os.path.getsize(group[0]) * (len(group) - 1), group)
+    """
+    hashes = {}
+    if cache and os.path.isfile(cache):
+        with open(cache, 'r') as f:
+            hashes = json.load(f)
+
+    stats = {}
+    by_size = collections.defaultdict(list)
+    path = os.path.abspath(path) if path is not None else None
+    for file_path in walk_dir(search, path=path, min_size=min_size):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        stats[file_path] = [stat.st_size, stat.st_mtime_ns]
+        by_size[stat.st_size].append(file_path)
+
+    def cached(file_path, position):
+        entry = hashes.get(file_path)
+        if entry and entry[:2] == stats[file_path]:
+            return entry[position]
+        hashes[file_path] = stats[file_path] + [None, None]
+        return None
+
+    by_ends = collections.defaultdict(list)
+    for size, group in by_size.items():
+        for file_path in group if len(group) > 1 else []:
+            digest = cached(file_path, 2)
+            if digest is None:
+                try:
+                    digest = _hash_ends(file_path, block_size)
+                except OSError:
+                    continue
+                hashes[file_path][2] = digest
+            by_ends[size, digest].append(file_path)
+
+    by_content = collections.defaultdict(list)
+    pending = []
+    for (size, digest), group in by_ends.items():
+        if len(group) < 2:
+            continue
+        if size <= 2 * block_size:
+            by_content[digest].extend(group)
+            continue
+        for file_path in group:
+            full = cached(file_path, 3)
+            if full is None:
+                pending.append(file_path)
+            else:
+                by_content[full].append(file_path)
+
+    if pending:
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for file_path, full in zip(pending,
+                                       executor.map(_hash_file, pending)):
+                if full is not None:
+                    hashes[file_path][3] = full
+                    by_content[full].append(file_path)
+
+    if cache:
+        def current(file_path, entry):
+            if file_path in stats:
+                return True
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return False
+            return entry[:2] == [stat.st_size, stat.st_mtime_ns]
+
+        temp_path = '{}.{}.tmp'.format(cache, os.getpid())
+        with open(temp_path, 'w') as f:
+            json.dump({k: v for k, v in hashes.items() if current(k, v)}, f)
+        os.replace(temp_path, cache)
+
+    return sorted(sorted(x) for x in by_content.values() if len(x) > 1)
+
+
+def _hash_ends(path: str, block_size: int) -> str:
+    """Return a hash of the first and last blocks of a file.
+
+    :param str path: path to file
+    :param int block_size: number of bytes read at each end
+    :returns: hexadecimal digest
+    :rtype: str
+    """
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        digest.update(f.read(block_size))
+        size = os.fstat(f.fileno()).st_size
+        if size > block_size:
+            f.seek(max(size - block_size, block_size))
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+def _hash_file(path: str, block_size: int=2 ** 20) -> Union[str, None]:
+    """Return a hash of the full content of a file.
+
+    :param str path: path to file
+    :param int block_size: number of bytes read at once (default: 1 MB)
+    :returns: hexadecimal digest or None if the file cannot be read
+    :rtype: str or None
+    """
+    digest = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(functools.partial(f.read, block_size), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class FollowFile:
+    """Incrementally read lines appended to a growing ascii file.
+
+    Only complete lines written since the previous read are returned. The \
+    position is tracked as a byte offset together with the inode of the \
+    file, so truncation or replacement of the file (log rotation) restarts \
+    reading from the beginning of the new contents.
+
+    .. note:: Compressed files are not supported.
+
+    :param str path: path to file
+    :param str checkpoint: path to a JSON file used to persist the position \
+        between runs (default: None will keep the position in memory only)
+
+    :Attributes:
+
+        - **checkpoint**: *str* path to the file holding the saved position
+        - **inode**: *int* inode of the file at the saved position
+        - **offset**: *int* byte offset following the last complete line read
+        - **path**: *str* path to file
+        - **rows**: *int* number of complete lines read since the beginning \
+            of the file
+
+    **Example**:
+
+        * Poll a simulation output file and process the new records.
+
+    ::
+
+        follow = FollowFile('results.txt', checkpoint='results.pos')
+        for chunk in follow.read_records(skip_rows=1, chunk_rows=10000):
+            process(chunk)
+    """
+    def __init__(self, path: str, checkpoint: Union[str, None]=None):
+        self.path = path
+        self.checkpoint = checkpoint
+        self.inode = None
+        self.offset = 0
+        self.rows = 0
+
+        if checkpoint and os.path.isfile(checkpoint):
+            with open(checkpoint, 'r') as f:
+                saved = json.load(f)
+            if saved.get('path') == os.path.abspath(path):
+                self.inode = saved['inode']
+                self.offset = saved['offset']
+                self.rows = saved['rows']
+
+    def __repr__(self):
+        return 'FollowFile(path={!r}, checkpoint={!r})'.format(self.path,
+                                                              self.checkpoint)
+
+    def _save(self):
+        """Save the current position to the checkpoint file."""
+        if not self.checkpoint:
+            return
+        temp_path = '{}.{}.tmp'.format(self.checkpoint, os.getpid())
+        with open(temp_path, 'w') as f:
+            json.dump({'path': os.path.abspath(self.path), 'inode': self.inode,
+                       'offset': self.offset, 'rows': self.rows}, f)
+        os.replace(temp_path, self.checkpoint)
+
+    def _open(self) -> Union[IO, None]:
+        """Open the file at the saved position.
+
+        :returns: binary file object positioned at the saved offset or None \
+            if the file does not exist
+        :rtype: file or None
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        stat = os.fstat(f.fileno())
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode = stat.st_ino
+            self.offset = 0
+            self.rows = 0
+        f.seek(self.offset)
+        return f
+
+    def read_lines(self) -> List[str]:
+        """Return complete lines appended since the previous read.
+
+        .. note:: A partially written final line is left for the next read.
+
+        :returns: new lines including line endings
+        :rtype: list
+        """
+        f = self._open()
+        if f is None:
+            return []
+        with f:
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        self.rows += data.count(b'\n', 0, end)
+        self._save()
+        return data[:end].decode().splitlines(keepends=True)
+
+    def read_records(self, chunk_rows: int=100000, skip_rows: int=0,
+                     cols: Tuple[int]=None, names: Union[tuple, None]=None,
+                     formats: tuple=('f8', )) -> Iterator[np.ndarray]:
+        """Return records parsed from lines appended since the previous read.
+
+        .. note:: Argument "skip_rows" counts lines from the beginning of \
+            the file, so a header written across several reads is skipped \
+            completely, and skipping restarts after the file was truncated \
+            or rotated.
+
+        .. note:: Lines are read incrementally, so memory is bounded by \
+            "chunk_rows". The position advances past a chunk only when the \
+            next chunk is requested or the generator is exhausted, so a \
+            chunk whose processing is interrupted is returned again by the \
+            next read.
+
+        :param int chunk_rows: maximum number of records in each chunk \
+            (default: 100000)
+        :param int skip_rows: number of header rows to skip at beginning of \
+            file (default: 0)
+        :param tuple cols: tuple of columns to be loaded as records \
+            (default: None will load all columns)
+        :param tuple names: names to be assigned to each column \
+            (default: None will use the column numbers)
+        :param tuple formats: format to be assigned to each column
+        :returns: record arrays of the new rows
+        :rtype: generator
+        """
+        f = self._open()
+        if f is None:
+            return
+
+        with f:
+            position = self.offset
+            count = self.rows
+            dtype = None
+            rows = []
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                position += len(line)
+                count += 1
+                if count <= skip_rows:
+                    continue
+                text = line.decode()
+                if not text.split('#', 1)[0].strip():
+                    continue
+
+                if dtype is None:
+                    if cols is None:
+                        cols = range(len(text.split()))
+                    cols = list(cols)
+                    if len(formats) != len(cols):
+                        formats = (formats[0],) * len(cols)
+                    header = names if names else [str(x) for x in cols]
+                    dtype = {'names': header, 'formats': formats}
+
+                rows.append(text)
+                if len(rows) == chunk_rows:
+                    yield np.loadtxt(rows, usecols=cols, dtype=dtype,
+                                     ndmin=1)
+                    rows = []
+                    self.offset = position
+                    self.rows = count
+                    self._save()
+
+            if rows:
+                yield np.loadtxt(rows, usecols=cols, dtype=dtype, ndmin=1)
+            self.offset = position
+            self.rows = count
+            self._save()
+
+
 def get_header(path: str, header_row: int=0) -> tuple:
     """Extract header from the requested file.
 
     .. note: To select the first row of the file enter header_row=0.
 
+    .. note:: Files compressed with gzip, bz2 or xz are detected from their \
+        leading bytes and decompressed while reading.
+
     :param str path: path to file
     :param int header_row: row of file that contains the header information
     :returns: header names for each column
@@ -52,6 +842,164 @@ def get_header(path: str, header_row: int=0) -> tuple:
     return head[header_row].split()
 
 
+class GzipIndex:
+    """Random access to the uncompressed contents of a gzip file.
+
+    The file is decompressed once to record checkpoints, pairs of \
+    compressed and uncompressed byte offsets, at gzip member boundaries \
+    spaced at least "spacing" uncompressed bytes apart. The checkpoints are \
+    saved next to the archive and rebuilt when its size or modification \
+    time changes. A read decompresses only from the nearest checkpoint at \
+    or before the requested offset.
+
+    .. note:: Decompression can only restart at the beginning of a gzip \
+        member, because the Python zlib module cannot restore a \
+        decompressor at an arbitrary bit position. Archives written by \
+        :func:`zip_file` with workers greater than one (or other \
+        multi-member tools such as bgzip) contain a member every \
+        "block_size" bytes. A single-member archive has one checkpoint and \
+        every read decompresses from the start.
+
+    :param str path: path to gzip file
+    :param int spacing: minimum number of uncompressed bytes between \
+        checkpoints (default: 16 MB)
+    :param bool save: save the checkpoints to a sidecar file (default: True)
+
+    :Attributes:
+
+        - **compressed_offsets**: *ndarray* compressed byte offset of each \
+            checkpoint
+        - **index_path**: *str* path to the sidecar file holding the \
+            checkpoints
+        - **path**: *str* path to gzip file
+        - **size**: *int* total number of uncompressed bytes
+        - **uncompressed_offsets**: *ndarray* uncompressed byte offset of \
+            each checkpoint
+
+    **Example**:
+
+        * Read 1 kB from the middle of an archived log.
+
+    ::
+
+        zip_file('example.log', workers=4, block_size=2 ** 22)
+        index = GzipIndex('example.log.gz')
+        text = index.read(index.size // 2, 1024).decode()
+    """
+    read_size = 2 ** 16
+
+    def __init__(self, path: str, spacing: int=2 ** 24, save: bool=True):
+        self.path = path
+        self.index_path = '{}.gzi.npz'.format(path)
+        self.spacing = spacing
+        self.compressed_offsets = None
+        self.uncompressed_offsets = None
+        self.size = 0
+
+        if not (save and self._load()):
+            self._build()
+            if save:
+                self._save()
+
+    def __repr__(self):
+        return 'GzipIndex(path={!r})'.format(self.path)
+
+    def _build(self):
+        """Decompress the file and record checkpoints at member boundaries."""
+        compressed = [0]
+        uncompressed = [0]
+        position = 0
+        size = 0
+        decompressor = zlib.decompressobj(wbits=31)
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(self.read_size), b''):
+                data = block
+                while data:
+                    size += len(decompressor.decompress(data))
+                    if not decompressor.eof:
+                        position += len(data)
+                        break
+                    unused = decompressor.unused_data
+                    position += len(data) - len(unused)
+                    data = unused
+                    decompressor = zlib.decompressobj(wbits=31)
+                    if size - uncompressed[-1] >= self.spacing:
+                        compressed.append(position)
+                        uncompressed.append(size)
+
+        self.compressed_offsets = np.array(compressed, dtype=np.int64)
+        self.uncompressed_offsets = np.array(uncompressed, dtype=np.int64)
+        self.size = size
+
+    def _load(self) -> bool:
+        """Load saved checkpoints if they match the current file.
+
+        :returns: True if the checkpoints were loaded
+        :rtype: bool
+        """
+        try:
+            with np.load(self.index_path) as saved:
+                stat = os.stat(self.path)
+                if (saved['file_size'] == stat.st_size and
+                        saved['mtime'] == stat.st_mtime_ns and
+                        saved['spacing'] == self.spacing):
+                    self.compressed_offsets = saved['compressed']
+                    self.uncompressed_offsets = saved['uncompressed']
+                    self.size = int(saved['size'])
+                    return True
+        except (OSError, KeyError, ValueError):
+            pass
+        return False
+
+    def _save(self):
+        """Save the checkpoints with the file size and modification time."""
+        stat = os.stat(self.path)
+        temp_path = '{}.{}.tmp'.format(self.index_path, os.getpid())
+        with open(temp_path, 'wb') as f:
+            np.savez(f, compressed=self.compressed_offsets,
+                     uncompressed=self.uncompressed_offsets, size=self.size,
+                     spacing=self.spacing, file_size=stat.st_size,
+                     mtime=stat.st_mtime_ns)
+        os.replace(temp_path, self.index_path)
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Return uncompressed bytes starting at an uncompressed offset.
+
+        :param int offset: uncompressed byte offset to start reading
+        :param int size: maximum number of bytes to return
+        :returns: uncompressed data
+        :rtype: bytes
+        """
+        offset = max(int(offset), 0)
+        if size <= 0 or offset >= self.size:
+            return b''
+
+        idx = np.searchsorted(self.uncompressed_offsets, offset,
+                              side='right') - 1
+        skip = offset - int(self.uncompressed_offsets[idx])
+        needed = skip + size
+        output = []
+        total = 0
+        decompressor = zlib.decompressobj(wbits=31)
+        with open(self.path, 'rb') as f:
+            f.seek(int(self.compressed_offsets[idx]))
+            for block in iter(lambda: f.read(self.read_size), b''):
+                data = block
+                while data and total < needed:
+                    text = decompressor.decompress(data, needed - total)
+                    output.append(text)
+                    total += len(text)
+                    if decompressor.eof:
+                        data = decompressor.unused_data
+                        decompressor = zlib.decompressobj(wbits=31)
+                    else:
+                        data = decompressor.unconsumed_tail
+                if total >= needed:
+                    break
+
+        return b''.join(output)[skip:needed]
+
+
 def flatten(matrix: List[Any]) -> list:
     """Flatten a matrix (list of lists) into a single list.
 
@@ -68,17 +1016,70 @@ def logger_setup(name: Union[str, None]=None,
                  log_file: Union[None, str]=None,
                  master_level: int=logging.DEBUG,
                  console_level: int=logging.DEBUG,
-                 file_level: int=logging.WARNING) -> logging.Logger:
+                 file_level: int=logging.WARNING,
+                 queue_size: Union[int, None]=None,
+                 queue_full: str='drop', max_bytes: int=0,
+                 when: Union[str, None]=None, interval: int=1,
+                 backup_count: int=0, json_lines: bool=False,
+                 sample: int=1, rate: Union[float, None]=None,
+                 burst: Union[int, None]=None,
+                 limit_level: int=logging.INFO) -> logging.Logger:
     """Setup logging.
 
     .. note:: available log levels are DEBUG, INFO, WARNING, ERROR and CRITICAL
 
+    .. note:: If argument "queue_size" is supplied the logger only places \
+        records on a bounded queue, and the console and file handlers run \
+        on a background thread. The listener is stopped, after writing the \
+        queued records and flushing the handlers, when the interpreter \
+        exits. The queue handler exposes the listener as attribute \
+        "listener" and the number of dropped records as attribute "dropped".
+
+    .. note:: If argument "max_bytes" or "when" is supplied the log file is \
+        rotated, and each rotated file is compressed with :func:`zip_file` \
+        on a background thread. Rotation is by size or by time, so \
+        supplying both raises a ValueError. A rollover waits for the previous \
+        compression to finish. Size based backups are numbered from 1 for \
+        the newest file.
+
+    .. note:: If argument "sample" or "rate" is supplied, records at or \
+        below argument "limit_level" pass a filter on the logger that keeps \
+        one record in every "sample" and then applies a token bucket \
+        refilled at "rate" records per second. Rejected records are never \
+        formatted. The filter is exposed in the filters attribute of the \
+        logger and counts rejected records in attributes "sampled_out" and \
+        "rate_limited".
+
     :param str name: name of the logger
     :param log_file: name of log file
     :type: None str
     :param int master_level: desired master log level
     :param int console_level: desired log level for console
     :param int file_level: desired log level for file
+    :param int queue_size: maximum number of queued records (default: None \
+        will write records on the calling thread)
+    :param str queue_full: 'drop' to discard records or 'block' to wait \
+        for space when the queue is full (default: 'drop')
+    :param int max_bytes: rotate the log file before it exceeds this size, \
+        cannot be combined with "when" (default: 0 will not rotate by size)
+    :param str when: unit of the rotation interval accepted by \
+        logging.handlers.TimedRotatingFileHandler, such as 'H' or \
+        'midnight', cannot be combined with "max_bytes" \
+        (default: None will not rotate by time)
+    :param int interval: number of "when" units between rotations \
+        (default: 1)
+    :param int backup_count: number of rotated files kept (default: 0 \
+        will keep all rotated files)
+    :param bool json_lines: write the log file as one JSON object per \
+        record (default: False)
+    :param int sample: keep one in every "sample" limited records \
+        (default: 1 will keep every record)
+    :param float rate: maximum sustained number of limited records per \
+        second (default: None will not limit the rate)
+    :param int burst: number of limited records allowed at once above the \
+        rate (default: None will use the rate rounded up)
+    :param int limit_level: highest level sampled and rate limited \
+        (default: logging.INFO)
     :returns: logger object
     :rtype: logging.Logger
 
@@ -93,7 +1094,33 @@ def logger_setup(name: Union[str, None]=None,
 
         logger = system.logger_setup(name=__name__)
 
+        * Keep terminal and disk writes off the calling thread.
+
+    ::
+
+        logger = system.logger_setup(name=__name__, log_file='run.log',
+                                     queue_size=10000)
+
+        * Start a new compressed log file every night and keep a week.
+
+    ::
+
+        logger = system.logger_setup(name=__name__, log_file='run.log',
+                                     when='midnight', backup_count=7)
+
+        * Keep at most 10 debug and info records per second as JSON lines.
+
+    ::
+
+        logger = system.logger_setup(name=__name__, log_file='run.jsonl',
+                                     file_level=logging.DEBUG,
+                                     json_lines=True, rate=10)
     """
+    if queue_full not in ('drop', 'block'):
+        raise ValueError("queue_full must be 'drop' or 'block'.")
+    if when and max_bytes:
+        raise ValueError('Supply either max_bytes or when, not both.')
+
     date_format = '%m/%d/%Y %I:%M:%S'
     log_format = ('%(asctime)s  %(levelname)8s  -> %(name)s <- '
                   '(line: %(lineno)d) %(message)s\n')
@@ -105,24 +1132,489 @@ def logger_setup(name: Union[str, None]=None,
     log.setLevel(master_level)
 
     if not log.handlers:
+        handlers = []
         console_handler = chromalog.log.ColorizingStreamHandler()
         console_handler.setLevel(console_level)
         console_handler.setFormatter(color_formatter)
-        log.addHandler(console_handler)
+        handlers.append(console_handler)
 
         if log_file:
-            file_handler = logging.FileHandler(filename=log_file)
+            if when:
+                file_handler = _TimedRotatingGzipHandler(
+                    filename=log_file, when=when, interval=interval,
+                    backupCount=backup_count)
+            elif max_bytes:
+                file_handler = _RotatingGzipHandler(
+                    filename=log_file, maxBytes=max_bytes,
+                    backupCount=backup_count)
+            else:
+                file_handler = logging.FileHandler(filename=log_file)
             file_handler.setLevel(file_level)
-            file_handler.setFormatter(formatter)
-            log.addHandler(file_handler)
+            file_handler.setFormatter(_JsonFormatter() if json_lines
+                                      else formatter)
+            handlers.append(file_handler)
+
+        if sample > 1 or rate is not None:
+            log.addFilter(_RecordLimiter(sample=sample, rate=rate,
+                                         burst=burst, level=limit_level))
+
+        if queue_size is None:
+            for handler in handlers:
+                log.addHandler(handler)
+        else:
+            records = queue.Queue(maxsize=max(int(queue_size), 1))
+            queue_handler = _BoundedQueueHandler(records,
+                                                 block=queue_full == 'block')
+            queue_handler.listener = _LogListener(records, *handlers,
+                                                  respect_handler_level=True)
+            queue_handler.listener.start()
+            atexit.register(queue_handler.listener.stop)
+            log.addHandler(queue_handler)
 
     return log
 
 
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops or waits for space when the queue is full.
+
+    :param records: bounded queue shared with the listener
+    :type: queue.Queue
+    :param bool block: wait for space instead of dropping the record
+
+    :Attributes:
+
+        - **block**: *bool* wait for space when the queue is full
+        - **dropped**: *int* number of records dropped on a full queue
+        - **listener**: *QueueListener* listener writing the queued records
+    """
+    def __init__(self, records: queue.Queue, block: bool):
+        super().__init__(records)
+        self.block = block
+        self.dropped = 0
+        self.listener = None
+
+    def enqueue(self, record: logging.LogRecord):
+        """Place a record on the queue.
+
+        :param record: prepared log record
+        :type: logging.LogRecord
+        """
+        if self.block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LogListener(logging.handlers.QueueListener):
+    """Queue listener that writes every queued record before stopping."""
+    def enqueue_sentinel(self):
+        """Wait for space on a full queue to place the stop signal."""
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        """Write the queued records, stop the thread and flush the handlers.
+
+        .. note:: Calling stop on a stopped listener has no effect.
+        """
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+class _JsonFormatter(logging.Formatter):
+    """Format log records as single line JSON objects."""
+    def format(self, record: logging.LogRecord) -> str:
+        """Return a JSON object describing a log record.
+
+        :param record: log record
+        :type: logging.LogRecord
+        :returns: JSON text without a trailing newline
+        :rtype: str
+        """
+        entry = {'time': dt.datetime.fromtimestamp(record.created)
+                 .isoformat(timespec='microseconds'),
+                 'level': record.levelname,
+                 'name': record.name,
+                 'line': record.lineno,
+                 'message': record.getMessage()}
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _RecordLimiter(logging.Filter):
+    """Logger filter sampling and rate limiting low level records.
+
+    :param int sample: keep one in every "sample" records
+    :param float rate: token bucket refill rate in records per second, or \
+        None to skip rate limiting
+    :param int burst: token bucket capacity, or None to use the rate \
+        rounded up
+    :param int level: highest level sampled and rate limited
+
+    :Attributes:
+
+        - **rate_limited**: *int* number of records rejected by the bucket
+        - **sampled_out**: *int* number of records rejected by sampling
+    """
+    def __init__(self, sample: int=1, rate: Union[float, None]=None,
+                 burst: Union[int, None]=None, level: int=logging.INFO):
+        super().__init__()
+        self.sample = max(int(sample), 1)
+        self.rate = rate
+        self.burst = (burst if burst is not None else
+                      max(math.ceil(rate or 0), 1))
+        self.level = level
+        self.rate_limited = 0
+        self.sampled_out = 0
+        self._seen = 0
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return True if a record should be logged.
+
+        :param record: unformatted log record
+        :type: logging.LogRecord
+        :returns: True if the record passes sampling and rate limiting
+        :rtype: bool
+        """
+        if record.levelno > self.level:
+            return True
+
+        with self._lock:
+            self._seen += 1
+            if (self._seen - 1) % self.sample:
+                self.sampled_out += 1
+                return False
+
+            if self.rate is None:
+                return True
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._stamp) * self.rate,
+                               self.burst)
+            self._stamp = now
+            if self._tokens < 1:
+                self.rate_limited += 1
+                return False
+            self._tokens -= 1
+            return True
+
+
+class _GzipRotation:
+    """Mixin compressing rotated log files on a background thread.
+
+    .. note:: The mixin precedes a logging.handlers.BaseRotatingHandler \
+        subclass in the bases of a handler.
+    """
+    _executor = None
+    _pending = None
+
+    def namer(self, name: str) -> str:
+        """Return the name of a rotated log file.
+
+        :param str name: default name of the rotated file
+        :returns: name with the gzip extension
+        :rtype: str
+        """
+        return '{}{}'.format(name, CODECS['gzip'].extension)
+
+    def rotator(self, source: str, dest: str):
+        """Move the log file aside and compress it on a background thread.
+
+        :param str source: path to the current log file
+        :param str dest: path to the compressed rotated file
+        """
+        if not os.path.isfile(source):
+            return
+        plain = dest[:-len(CODECS['gzip'].extension)]
+        os.replace(source, plain)
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(max_workers=1)
+        self._pending = self._executor.submit(zip_file, plain)
+
+    def doRollover(self):
+        """Wait for the previous compression before rotating the log file."""
+        self._wait()
+        super().doRollover()
+
+    def _wait(self):
+        """Wait for the previous compression to finish."""
+        if self._pending is not None:
+            try:
+                self._pending.result()
+            except OSError:
+                pass
+            self._pending = None
+
+    def close(self):
+        """Close the log file and wait for the compression to finish."""
+        super().close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class _RotatingGzipHandler(_GzipRotation,
+                           logging.handlers.RotatingFileHandler):
+    """Size based rotating file handler compressing rotated files.
+
+    .. note:: A backup count of 0 keeps every rotated file instead of \
+        disabling rotation.
+    """
+    def doRollover(self):
+        """Rotate the log file, keeping every backup if backupCount is 0."""
+        if self.backupCount > 0:
+            super().doRollover()
+            return
+
+        self._wait()
+        count = 1
+        while os.path.exists(self.rotation_filename(
+                '{}.{}'.format(self.baseFilename, count))):
+            count += 1
+        self.backupCount = count
+        try:
+            super().doRollover()
+        finally:
+            self.backupCount = 0
+
+
+class _TimedRotatingGzipHandler(_GzipRotation,
+                                logging.handlers.TimedRotatingFileHandler):
+    """Time based rotating file handler compressing rotated files."""
+
+
+class LineIndex:
+    """Random access to the lines of a large ascii file.
+
+    The byte offset of every line is found in one pass over the file and \
+    saved next to it, so later instances load the offsets instead of \
+    scanning again. The saved index is rebuilt when the size or \
+    modification time of the file changes. Lines are read through a \
+    memory map.
+
+    .. note:: Compressed files are not supported.
+
+    :param str path: path to file
+    :param bool save: save the offsets to a sidecar file (default: True)
+
+    :Attributes:
+
+        - **index_path**: *str* path to the sidecar file holding the offsets
+        - **offsets**: *ndarray* byte offset of the start of each line \
+            followed by the file size
+        - **path**: *str* path to file
+
+    **Example**:
+
+        * Read a single line and a range of lines from a large log.
+
+    ::
+
+        with LineIndex('example.log') as lines:
+            line = lines[40000000]
+            block = lines[100:200]
+    """
+    block_size = 2 ** 24
+
+    def __init__(self, path: str, save: bool=True):
+        if _compression(path):
+            raise ValueError('LineIndex does not support compressed files: '
+                             '{}'.format(path))
+        self.path = path
+        self.index_path = '{}.idx.npz'.format(path)
+        self.offsets = self._load() if save else None
+        if self.offsets is None:
+            self.offsets = self._build()
+            if save:
+                self._save()
+
+        self._file = open(path, 'rb')
+        if self.offsets[-1]:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        else:
+            self._map = None
+
+    def __repr__(self):
+        return 'LineIndex(path={!r})'.format(self.path)
+
+    def __len__(self):
+        return self.offsets.size - 1
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(item, slice):
+            return [self._line(x) for x in range(len(self))[item]]
+        return self._line(range(len(self))[item])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _build(self) -> np.ndarray:
+        """Scan the file for newline characters.
+
+        :returns: byte offset of the start of each line followed by the \
+            file size
+        :rtype: ndarray
+        """
+        starts = [np.zeros(1, dtype=np.int64)]
+        position = 0
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(self.block_size), b''):
+                buffer = np.frombuffer(block, dtype=np.uint8)
+                starts.append(np.flatnonzero(buffer == 10) + position + 1)
+                position += len(block)
+
+        offsets = np.concatenate(starts)
+        if offsets[-1] != position:
+            offsets = np.append(offsets, position)
+        return offsets
+
+    def _line(self, idx: int) -> str:
+        """Return a single line.
+
+        :param int idx: line number
+        :returns: text of the line including the line ending
+        :rtype: str
+        """
+        return self._map[self.offsets[idx]:self.offsets[idx + 1]].decode()
+
+    def _load(self) -> Union[np.ndarray, None]:
+        """Load the saved offsets if they match the current file.
+
+        :returns: saved offsets or None if the sidecar is missing or stale
+        :rtype: ndarray or None
+        """
+        try:
+            with np.load(self.index_path) as saved:
+                stat = os.stat(self.path)
+                if (saved['size'] == stat.st_size and
+                        saved['mtime'] == stat.st_mtime_ns):
+                    return saved['offsets']
+        except (OSError, KeyError, ValueError):
+            pass
+        return None
+
+    def _save(self):
+        """Save the offsets along with the file size and modification time."""
+        stat = os.stat(self.path)
+        temp_path = '{}.{}.tmp'.format(self.index_path, os.getpid())
+        with open(temp_path, 'wb') as f:
+            np.savez(f, offsets=self.offsets, size=stat.st_size,
+                     mtime=stat.st_mtime_ns)
+        os.replace(temp_path, self.index_path)
+
+    def close(self):
+        """Release the memory map and file handle."""
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def sample(self, qty: int, seed: Union[int, None]=None) -> List[str]:
+        """Return lines selected at random without replacement.
+
+        :param int qty: number of lines to return
+        :param int seed: seed for the random number generator \
+            (default: None)
+        :returns: selected lines in file order
+        :rtype: list
+        """
+        rng = np.random.RandomState(seed)
+        selected = rng.choice(len(self), size=min(qty, len(self)),
+                              replace=False)
+        return [self._line(x) for x in np.sort(selected)]
+
+
+def load_batch(paths: Union[str, List[str]], workers: Union[int, None]=None,
+               source_field: Union[str, None]=None, processes: bool=False,
+               **kwargs) -> np.ndarray:
+    """Load many ascii files into a single array with fields and records.
+
+    .. note:: Files are parsed concurrently with :func:`load_records` and \
+        copied once into a preallocated output array in the order of \
+        argument "paths".
+
+    .. note:: Formats of matching fields are promoted to a common format \
+        when the files produce different formats (e.g. formats='infer').
+
+    :param paths: paths to files to load or a search string passed to \
+        :func:`walk_dir`
+    :type: str list
+    :param int workers: maximum number of concurrent files (default: None \
+        will use the executor default)
+    :param str source_field: name of an additional int32 field holding the \
+        position of the source file in the list of paths (default: None \
+        will not add the field)
+    :param bool processes: parse files in a process pool instead of a \
+        thread pool (default: False)
+    :param kwargs: keyword arguments passed to :func:`load_records`
+    :returns: records of all files
+    :rtype: ndarray
+
+    **Example**:
+
+        * Load every run file below the current directory.
+
+    ::
+
+        records = load_batch('run_', header_row=0, skip_rows=1,
+                             source_field='run')
+        run_paths = walk_dir('run_')
+    """
+    if isinstance(paths, str):
+        paths = walk_dir(paths)
+
+    pool = futures.ProcessPoolExecutor if processes else \
+        futures.ThreadPoolExecutor
+    with pool(max_workers=workers) as executor:
+        jobs = [executor.submit(load_records, x, **kwargs) for x in paths]
+        pieces = [np.atleast_1d(x.result()) for x in jobs]
+
+    if not pieces:
+        raise ValueError('No files to load.')
+
+    names = pieces[0].dtype.names
+    if any(x.dtype.names != names for x in pieces):
+        raise ValueError('Files do not share the same fields.')
+    formats = [functools.reduce(np.promote_types,
+                                [x.dtype[name] for x in pieces])
+               for name in names]
+    if source_field:
+        names += (source_field, )
+        formats.append(np.int32)
+
+    records = np.empty(sum(x.size for x in pieces),
+                       dtype={'names': names, 'formats': formats})
+    start = 0
+    for idx, piece in enumerate(pieces):
+        stop = start + piece.size
+        for name in piece.dtype.names:
+            records[name][start:stop] = piece[name]
+        if source_field:
+            records[source_field][start:stop] = idx
+        pieces[idx] = None
+        start = stop
+
+    return records
+
+
 def load_file(path: str, all_lines: bool=True,
               first_n_lines: int=0) -> Union[str, List[str]]:
     """Load ascii file into memory.
 
+    .. note:: Files compressed with gzip, bz2 or xz are detected from their \
+        leading bytes and decompressed while reading.
+
     .. note:: If argument "all_lines" is True then the entire file will be \
         returned with each line as an item in a list and argument \
         "first_n_lines" will be ignored.
@@ -143,7 +1635,7 @@ def load_file(path: str, all_lines: bool=True,
 
         load_file('example.txt', all_lines=False, first_n_lines=1)
     """
-    with open(path, 'r') as f:
+    with _open_file(path) as f:
         if all_lines:
             return f.readlines()
         elif first_n_lines:
@@ -152,14 +1644,90 @@ def load_file(path: str, all_lines: bool=True,
             return f.read()
 
 
+def _compression(path: str) -> Union[str, None]:
+    """Return the name of the codec used to compress a file by magic bytes.
+
+    :param str path: path to file
+    :returns: name of the matching codec in CODECS or None if the file is \
+        not compressed
+    :rtype: str or None
+    """
+    with open(path, 'rb') as f:
+        lead = f.read(16)
+
+    for name, codec in CODECS.items():
+        if codec.magic.match(lead):
+            return name
+    return None
+
+
+def _open_file(path: str, mode: str='r') -> IO:
+    """Open a file for reading, decompressing any codec in CODECS on the fly.
+
+    :param str path: path to file
+    :param str mode: 'r' for text or 'rb' for bytes (default: 'r')
+    :returns: file object
+    :rtype: file
+    """
+    codec = _compression(path)
+    if codec is None:
+        return open(path, mode)
+    if 'b' not in mode:
+        mode = '{}t'.format(mode)
+    return CODECS[codec].reader(path, mode)
+
+
 def load_records(path: str, header_row: Union[int, None]=None,
                  skip_rows: int=0, cols: Tuple[Union[str, int]]=('all',),
                  names: Union[tuple, None]=None,
-                 formats: tuple=('f8', )) -> np.ndarray:
+                 formats: Union[tuple, str]=('f8', ),
+                 sample_rows: int=1000,
+                 cache_dir: Union[str, None]=None,
+                 cache_max_bytes: Union[int, None]=None,
+                 workers: int=1, engine: str='loadtxt',
+                 where: Union[dict, None]=None,
+                 predicate: Union[Callable, None]=None,
+                 chunk_rows: int=100000) -> np.ndarray:
     """Load ascii file into an array with fields and records.
 
     .. note:: Counting of the file rows begins with zero (first row = 0).
 
+    .. note:: If argument "formats" is 'infer' the first "sample_rows" data \
+        rows are examined and each column is assigned the narrowest of \
+        int8, int16, int32, int64, float32, float64 or fixed width bytes \
+        that holds every sampled value. Values beyond the sample that do \
+        not fit the inferred format will raise an error or be truncated.
+
+    .. note:: If argument "cache_dir" is supplied the parsed array is saved \
+        to a binary sidecar file in that directory. Later calls with the \
+        same arguments on an unchanged file (same size and modification \
+        time) return the sidecar memory-mapped read-only instead of \
+        parsing the text again.
+
+    .. note:: If argument "workers" is greater than one the file is split \
+        into byte ranges on line boundaries and each range is parsed in a \
+        separate process. The pieces are joined in file order, so the \
+        output matches the serial result. Compressed files are always \
+        parsed serially.
+
+    .. note:: Files compressed with gzip, bz2 or xz are detected from their \
+        leading bytes and decompressed while parsing.
+
+    .. note:: The 'numpy' engine splits whitespace delimited columns and \
+        converts the requested columns with vectorized numpy operations. \
+        Unused columns are never converted. It targets numpy releases \
+        before 1.23, where numpy.loadtxt tokenizes each row in Python; \
+        later releases parse in C and are usually faster with 'loadtxt'.
+
+    .. note:: If argument "where" or "predicate" is supplied the file is \
+        parsed "chunk_rows" rows at a time, in each worker process when \
+        "workers" is greater than one, and only the matching records of \
+        each chunk are copied into an output array grown in place. Peak \
+        memory is about the result plus one chunk per process. A predicate \
+        used with more than one worker must be picklable (e.g. a module \
+        level function). With "cache_dir" the whole file is cached and the \
+        filter is applied to the cached array.
+
     :param str path: path to file to load
     :param int header_row: row of file that contains the column headers \
         (default: None)
@@ -168,27 +1736,752 @@ def load_records(path: str, header_row: Union[int, None]=None,
     :param tuple cols: tuple of columns to be loaded as records \
         (default: 'all' will load all columns)
     :param tuple names: names to be assigned to each column
-    :param tuple formats: format to be assigned to each column
+    :param formats: format to be assigned to each column or 'infer' to \
+        select the narrowest format for each column from a sample of rows
+    :type: tuple str
+    :param int sample_rows: number of rows examined when formats='infer' \
+        (default: 1000)
+    :param str cache_dir: directory to hold binary sidecar files \
+        (default: None will disable caching)
+    :param int cache_max_bytes: maximum total size of the cache directory, \
+        least recently used sidecars are removed first (default: None \
+        will not limit the cache size)
+    :param int workers: number of processes used to parse the file \
+        (default: 1)
+    :param str engine: parser used to convert the text, 'loadtxt' for \
+        numpy.loadtxt or 'numpy' for the vectorized byte tokenizer \
+        (default: loadtxt)
+    :param dict where: field names and inclusive (low, high) bounds that \
+        records must satisfy, either bound may be None (default: None)
+    :param predicate: function accepting a record array and returning a \
+        boolean mask of the records to keep (default: None)
+    :type: function or None
+    :param int chunk_rows: number of rows parsed at a time when filtering \
+        (default: 100000)
     :returns: record array of the contents of the requested file
     :rtype: ndarray
+
+    **Example**:
+
+        * Keep the records with a positive first column.
+
+    ::
+
+        load_records('example.txt', where={'0': (0, None)})
+        load_records('example.txt', predicate=lambda x: x['0'] > 0)
+    """
+    cols, dtype = _record_dtype(path, header_row, cols, names, formats,
+                                skip_rows, sample_rows)
+
+    if cache_dir is None:
+        return _parse_records(path, skip_rows, cols, dtype, workers, engine,
+                              where, predicate, chunk_rows)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = _cache_path(cache_dir, path, header_row, skip_rows, cols,
+                             dtype)
+    if os.path.isfile(cache_path):
+        os.utime(cache_path)
+        return _filter_records(np.load(cache_path, mmap_mode='r'), where,
+                               predicate)
+
+    records = _parse_records(path, skip_rows, cols, dtype, workers, engine)
+    temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        np.save(f, records)
+    os.replace(temp_path, cache_path)
+
+    if cache_max_bytes is not None:
+        _prune_cache(cache_dir, cache_max_bytes)
+        if not os.path.isfile(cache_path):
+            return _filter_records(records, where, predicate)
+
+    return _filter_records(np.load(cache_path, mmap_mode='r'), where,
+                           predicate)
+
+
+def _cache_path(cache_dir: str, path: str, *args) -> str:
+    """Return the sidecar path for a file and the arguments used to parse it.
+
+    :param str cache_dir: directory holding the sidecar files
+    :param str path: path to the source file
+    :param args: additional values that change the parsed output
+    :returns: path to the binary sidecar file
+    :rtype: str
+    """
+    stat = os.stat(path)
+    key = repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns) + args)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, '{}.npy'.format(digest))
+
+
+def _line_ranges(path: str, skip_rows: int,
+                 qty: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that begin and end on line boundaries.
+
+    :param str path: path to file
+    :param int skip_rows: number of rows at the beginning of the file to omit
+    :param int qty: requested number of ranges
+    :returns: start and stop byte offsets of each non-empty range
+    :rtype: list
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        for _ in itertools.islice(f, skip_rows):
+            pass
+        bounds = [f.tell()]
+        step = max((size - bounds[0]) // qty, 1)
+        for n in range(1, qty):
+            position = bounds[0] + n * step
+            if position >= size:
+                break
+            f.seek(position - 1)
+            f.readline()
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+        bounds.append(size)
+
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start]
+
+
+def _load_range(path: str, start: int, stop: int, cols: List[int],
+                dtype: dict, engine: str='loadtxt',
+                where: Union[dict, None]=None,
+                predicate: Union[Callable, None]=None,
+                chunk_rows: int=100000,
+                block_size: int=2 ** 24) -> np.ndarray:
+    """Parse a byte range of an ascii file into a record array.
+
+    :param str path: path to file
+    :param int start: byte offset of the first line in the range
+    :param int stop: byte offset one past the last line in the range
+    :param list cols: column indices to load
+    :param dict dtype: names and formats of the columns
+    :param str engine: parser used to convert the text (default: loadtxt)
+    :param dict where: field names and inclusive (low, high) bounds \
+        (default: None)
+    :param predicate: function returning a boolean mask of records to keep \
+        (default: None)
+    :type: function or None
+    :param int chunk_rows: number of rows parsed at a time when filtering \
+        (default: 100000)
+    :param int block_size: number of bytes tokenized at a time by the \
+        numpy engine (default: 16 MB)
+    :returns: records contained in the byte range
+    :rtype: ndarray
+    """
+    if where or predicate:
+        def lines(f):
+            remaining = stop - start
+            for line in f:
+                yield line
+                remaining -= len(line)
+                if remaining <= 0:
+                    return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return _gather_records(_filter_lines(lines(f), cols, dtype,
+                                                 engine, chunk_rows, where,
+                                                 predicate), dtype)
+
+    if engine == 'numpy':
+        with open(path, 'rb') as f:
+            f.seek(start)
+            pieces = _tokenize_stream(f, cols, dtype, block_size=block_size,
+                                      size=stop - start)
+        if not pieces:
+            return np.empty(0, dtype=dtype)
+        return np.concatenate(pieces)
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+
+    text = data.decode()
+    if not text.strip():
+        return np.empty(0, dtype=dtype)
+    return np.loadtxt(text.splitlines(), usecols=cols, dtype=dtype, ndmin=1)
+
+
+def _parse_records(path: str, skip_rows: int, cols: List[int], dtype: dict,
+                   workers: int=1, engine: str='loadtxt',
+                   where: Union[dict, None]=None,
+                   predicate: Union[Callable, None]=None,
+                   chunk_rows: int=100000) -> np.ndarray:
+    """Parse an ascii file into a record array using one or more processes.
+
+    :param str path: path to file
+    :param int skip_rows: number of rows at the beginning of the file to omit
+    :param list cols: column indices to load
+    :param dict dtype: names and formats of the columns
+    :param int workers: number of processes used to parse the file \
+        (default: 1)
+    :param str engine: parser used to convert the text, either 'loadtxt' \
+        or 'numpy' (default: loadtxt)
+    :param dict where: field names and inclusive (low, high) bounds \
+        (default: None)
+    :param predicate: function returning a boolean mask of records to keep \
+        (default: None)
+    :type: function or None
+    :param int chunk_rows: number of rows parsed at a time when filtering \
+        (default: 100000)
+    :returns: record array of the contents of the file, one dimensional \
+        when filtering
+    :rtype: ndarray
+    """
+    if engine not in ('loadtxt', 'numpy'):
+        raise ValueError('Unknown engine: {}'.format(engine))
+
+    if where or predicate:
+        if workers <= 1 or _compression(path):
+            with _open_file(path, 'rb') as f:
+                for _ in itertools.islice(f, skip_rows):
+                    pass
+                return _gather_records(_filter_lines(f, cols, dtype, engine,
+                                                     chunk_rows, where,
+                                                     predicate), dtype)
+
+        ranges = _line_ranges(path, skip_rows, workers)
+        load = functools.partial(_load_range, path, cols=cols, dtype=dtype,
+                                 engine=engine, where=where,
+                                 predicate=predicate, chunk_rows=chunk_rows)
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            return _gather_records(executor.map(load, *zip(*ranges)), dtype)
+
+    if workers <= 1 or _compression(path):
+        if engine == 'loadtxt':
+            with _open_file(path) as f:
+                return np.loadtxt(f, skiprows=skip_rows, usecols=cols,
+                                  dtype=dtype)
+        with _open_file(path, 'rb') as f:
+            for _ in itertools.islice(f, skip_rows):
+                pass
+            pieces = _tokenize_stream(f, cols, dtype)
+    else:
+        ranges = _line_ranges(path, skip_rows, workers)
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            jobs = [executor.submit(_load_range, path, start, stop, cols,
+                                    dtype, engine)
+                    for start, stop in ranges]
+            pieces = [x.result() for x in jobs]
+
+    records = np.concatenate(pieces) if pieces else np.empty(0, dtype=dtype)
+    if records.size == 1:
+        return records.reshape(())
+    return records
+
+
+def _prune_cache(cache_dir: str, max_bytes: int):
+    """Remove least recently used sidecar files until under the size limit.
+
+    :param str cache_dir: directory holding the sidecar files
+    :param int max_bytes: maximum total size of the sidecar files
     """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith('.npy'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+    total = sum(x[1] for x in entries)
+    for _, size, cache_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(cache_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _tokenize_records(data: bytes, cols: List[int],
+                      dtype: dict) -> np.ndarray:
+    """Convert whitespace delimited ascii bytes into a record array.
+
+    Delimiters, line endings and comments are located with vectorized \
+    comparisons on the raw bytes. Only the requested columns are gathered \
+    into fixed width byte strings, which are then converted in bulk.
+
+    .. note:: Boolean columns are parsed as integers and compared with \
+        zero, and unicode columns are decoded as UTF-8, matching \
+        numpy.loadtxt. Other formats than bool, integer, float, bytes and \
+        unicode are rejected.
+
+    :param bytes data: complete lines of the file
+    :param list cols: column indices to load
+    :param dict dtype: names and formats of the columns
+    :returns: records contained in the data
+    :rtype: ndarray
+    :raises: ValueError
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    newline = buffer == 10
+    space = newline | (buffer == 32) | ((buffer >= 9) & (buffer <= 13))
+    hashes = buffer == 35
+    if hashes.any():
+        count = np.cumsum(hashes)
+        space |= count > np.maximum.accumulate(np.where(newline, count, 0))
+
+    word = ~space
+    first_byte = word.copy()
+    first_byte[1:] &= space[:-1]
+    last_byte = word
+    last_byte[:-1] &= space[1:]
+    starts = np.flatnonzero(first_byte)
+    lengths = np.flatnonzero(last_byte) + 1 - starts
+    records = np.empty(0, dtype=dtype)
+    if not starts.size:
+        return records
+
+    line = np.searchsorted(np.flatnonzero(newline), starts)
+    first = np.flatnonzero(np.r_[True, line[1:] != line[:-1]])
+    counts = np.diff(np.r_[first, starts.size])
+    if np.any(counts != counts[0]):
+        row = np.flatnonzero(counts != counts[0])[0]
+        raise ValueError('the number of columns changed from {} to {} at '
+                         'row {}'.format(counts[0], counts[row], row + 1))
+
+    records = np.empty(first.size, dtype=dtype)
+    for name, col in zip(records.dtype.names, cols):
+        if not -counts[0] <= col < counts[0]:
+            raise ValueError('invalid column index {} for {} columns'
+                             .format(col, counts[0]))
+        token = first + col % counts[0]
+        width = max(int(lengths[token].max()), 1)
+        offset = np.arange(width)
+        index = np.minimum(starts[token, None] + offset, buffer.size - 1)
+        text = np.where(offset < lengths[token, None], buffer[index], 0)
+        text = np.ascontiguousarray(text, dtype=np.uint8)
+        tokens = text.view('S{}'.format(width)).ravel()
+        kind = records.dtype[name].kind
+        if kind == 'b':
+            records[name] = tokens.astype(np.int64) != 0
+        elif kind == 'U':
+            records[name] = np.char.decode(tokens, 'utf-8')
+        elif kind in 'iufS':
+            records[name] = tokens
+        else:
+            raise ValueError("engine='numpy' does not support format {}"
+                             .format(records.dtype[name]))
+
+    return records
+
+
+def _tokenize_stream(f: IO, cols: List[int], dtype: dict,
+                     block_size: int=2 ** 24,
+                     size: Union[int, None]=None) -> List[np.ndarray]:
+    """Convert a binary stream into record arrays one block at a time.
+
+    :param file f: binary file object positioned at the first data row
+    :param list cols: column indices to load
+    :param dict dtype: names and formats of the columns
+    :param int block_size: number of bytes read per block \
+        (default: 16 MB)
+    :param size: number of bytes to read from the stream, or all \
+        remaining bytes if None (default: None)
+    :type: int or None
+    :returns: record arrays of consecutive blocks of the stream
+    :rtype: list
+    """
+    remaining = size
+
+    def read():
+        nonlocal remaining
+        if remaining is None:
+            return f.read(block_size)
+        block = f.read(min(block_size, remaining))
+        remaining -= len(block)
+        return block
+
+    pieces = []
+    remainder = b''
+    for block in iter(read, b''):
+        block = remainder + block
+        end = block.rfind(b'\n') + 1
+        remainder = block[end:]
+        if end:
+            pieces.append(_tokenize_records(block[:end], cols, dtype))
+    if remainder:
+        pieces.append(_tokenize_records(remainder, cols, dtype))
+
+    return pieces
+
+
+def _record_dtype(path: str, header_row: Union[int, None],
+                  cols: Tuple[Union[str, int]], names: Union[tuple, None],
+                  formats: Union[tuple, str], skip_rows: int=0,
+                  sample_rows: int=0) -> Tuple[list, dict]:
+    """Resolve the columns and structured dtype requested from a file.
+
+    .. note:: The header row, the column count and any rows sampled to \
+        infer formats are all taken from a single read of the file head.
+
+    :param str path: path to file to load
+    :param int header_row: row of file that contains the column headers
+    :param tuple cols: tuple of columns to be loaded as records
+    :param tuple names: names to be assigned to each column
+    :param formats: format to be assigned to each column or 'infer'
+    :type: tuple str
+    :param int skip_rows: number of header rows to skip at beginning of file \
+        (default: 0)
+    :param int sample_rows: number of rows examined when formats='infer' \
+        (default: 0)
+    :returns: column indices and dtype dictionary for numpy
+    :rtype: tuple
+    """
+    infer = isinstance(formats, str) and formats == 'infer'
+    header_idx = int(header_row) if isinstance(header_row, int) else 0
+    n_lines = header_idx + 1
+    if infer:
+        n_lines = max(n_lines, skip_rows + int(sample_rows))
+    head = load_file(path, all_lines=False, first_n_lines=n_lines)
+
     if cols[0] == 'all':
-        cols = range(len(get_header(path, header_row=0)))
+        cols = range(len(head[0].split()))
+    cols = list(cols)
+
+    if infer:
+        rows = [x.split() for x in head[skip_rows:]
+                if x.split('#', 1)[0].strip()]
+        formats = tuple(_infer_format([row[x] for row in rows])
+                        for x in cols)
 
     if len(formats) != len(cols):
         notify.warn('Formats redefined to match requested number of columns.')
         formats = (formats[0],) * len(cols)
 
     if isinstance(header_row, int):
-        header = get_header(path, header_row=header_row)
+        header = head[header_idx].split()
         header = [header[x] for x in cols]
     elif not header_row and names:
         header = names
     else:
         header = [str(x) for x in cols]
 
-    return np.loadtxt(path, skiprows=skip_rows, usecols=cols,
-                      dtype={'names': header, 'formats': formats})
+    return cols, {'names': header, 'formats': formats}
+
+
+def _filter_records(records: np.ndarray, where: Union[dict, None],
+                    predicate: Union[Callable, None]) -> np.ndarray:
+    """Return the records that satisfy the range filters and predicate.
+
+    :param ndarray records: record array to filter
+    :param dict where: field names and inclusive (low, high) bounds
+    :param predicate: function returning a boolean mask of records to keep
+    :type: function or None
+    :returns: matching records or the original array if there are no filters
+    :rtype: ndarray
+    """
+    if not (where or predicate):
+        return records
+
+    records = np.atleast_1d(records)
+    mask = np.ones(records.shape, dtype=bool)
+    for name, (low, high) in (where or {}).items():
+        mask &= _range_mask(records[name], low, high)
+    if predicate:
+        mask &= np.asarray(predicate(records), dtype=bool)
+    return records[mask]
+
+
+def _filter_lines(lines: Iterator[bytes], cols: List[int], dtype: dict,
+                  engine: str, chunk_rows: int,
+                  where: Union[dict, None]=None,
+                  predicate: Union[Callable, None]=None
+                  ) -> Iterator[np.ndarray]:
+    """Parse lines of bytes in chunks and yield the matching records.
+
+    :param lines: lines of an ascii file including line endings
+    :type: iterator
+    :param list cols: column indices to load
+    :param dict dtype: names and formats of the columns
+    :param str engine: parser used to convert the text, either 'loadtxt' \
+        or 'numpy'
+    :param int chunk_rows: maximum number of records parsed at a time
+    :param dict where: field names and inclusive (low, high) bounds \
+        (default: None)
+    :param predicate: function returning a boolean mask of records to keep \
+        (default: None)
+    :type: function or None
+    :returns: non-empty record arrays of consecutive matching rows
+    :rtype: generator
+    """
+    rows = (x for x in lines if x.split(b'#', 1)[0].strip())
+    for chunk in iter(lambda: list(itertools.islice(rows, chunk_rows)), []):
+        if engine == 'numpy':
+            records = _tokenize_records(b''.join(chunk), cols, dtype)
+        else:
+            records = np.loadtxt([x.decode() for x in chunk], usecols=cols,
+                                 dtype=dtype, ndmin=1)
+        records = _filter_records(records, where, predicate)
+        if records.size:
+            yield records
+
+
+def _gather_records(pieces: Iterator[np.ndarray],
+                    dtype: dict) -> np.ndarray:
+    """Copy record arrays into one array that is grown in place.
+
+    .. note:: Each piece may be released as soon as it is copied, so peak \
+        memory is the output plus the piece being copied.
+
+    :param pieces: record arrays sharing the same dtype
+    :type: iterator
+    :param dict dtype: names and formats of the columns
+    :returns: records of every piece in order
+    :rtype: ndarray
+    """
+    records = np.empty(0, dtype=dtype)
+    size = 0
+    for piece in pieces:
+        if size + piece.size > records.size:
+            records.resize(max(size + piece.size, records.size * 3 // 2),
+                           refcheck=False)
+        records[size:size + piece.size] = piece
+        size += piece.size
+    records.resize(size, refcheck=False)
+    return records
+
+
+def _infer_format(tokens: List[str]) -> str:
+    """Return the narrowest numpy format able to hold every token.
+
+    :param list tokens: text values from a single column
+    :returns: numpy format string
+    :rtype: str
+    """
+    if not tokens:
+        return 'f8'
+
+    try:
+        values = [int(x) for x in tokens]
+    except ValueError:
+        pass
+    else:
+        low, high = min(values), max(values)
+        for fmt in ('i1', 'i2', 'i4', 'i8'):
+            info = np.iinfo(fmt)
+            if info.min <= low and high <= info.max:
+                return fmt
+        return 'f8'
+
+    try:
+        values = [float(x) for x in tokens]
+    except ValueError:
+        return 'S{}'.format(max(len(x.encode()) for x in tokens))
+
+    for token, value in zip(tokens, values):
+        single = float(str(np.float32(token)))
+        if single != value and not (np.isnan(single) and np.isnan(value)):
+            return 'f8'
+    return 'f4'
+
+
+def memory_status(top: int=3, verbose: bool=False,
+                  enabled: Union[bool, Callable[[], bool], None]=True):
+    """Decorator: Record the memory allocated by every call.
+
+    .. note:: Peak bytes, net bytes and the "top" allocation sites of each \
+        call are measured with tracemalloc and recorded in CALL_REGISTRY. \
+        Tracing starts with the first active call if it is not already \
+        running and stops when the last active call in any thread returns. \
+        tracemalloc keeps one process-wide peak, so before a call resets \
+        it the current peak is folded into every active call, nested or \
+        in another thread.
+
+    .. note:: tracemalloc traces the whole process and slows allocation \
+        considerably, so allocations of concurrent threads are included in \
+        the results.
+
+    :param int top: number of allocation sites recorded per call, where 0 \
+        skips the tracemalloc snapshots (default: 3)
+    :param bool verbose: print the peak and net bytes of every call \
+        (default: False)
+    :param enabled: if False the function is returned undecorated; a \
+        callable is checked before every call; None checks \
+        CALL_REGISTRY.enabled before every call (default: True)
+    :type: bool function None
+
+    **Example**:
+
+        * Find the lines allocating memory while loading records.
+
+    ::
+
+        load = memory_status(top=5)(load_records)
+        load('results.txt', header_row=0, skip_rows=1)
+        print(CALL_REGISTRY.report())
+    """
+    if enabled is None:
+        def enabled():
+            return CALL_REGISTRY.enabled
+
+    @wrapt.decorator(enabled=enabled)
+    def wrapper(wrapped, instance, args, kwargs):
+        with _MEMORY_LOCK:
+            if not _MEMORY_CALLS and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _MEMORY_TRACING['started'] = True
+            start, peak = tracemalloc.get_traced_memory()
+            for active in _MEMORY_CALLS:
+                active[0] = max(active[0], peak)
+            tracemalloc.reset_peak()
+            call = [start]
+            _MEMORY_CALLS.append(call)
+
+        before = tracemalloc.take_snapshot() if top else None
+        try:
+            return wrapped(*args, **kwargs)
+        finally:
+            with _MEMORY_LOCK:
+                end, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, call[0])
+            sites = []
+            if top:
+                after = tracemalloc.take_snapshot()
+                for stat in after.compare_to(before, 'lineno'):
+                    frame = stat.traceback[0]
+                    if len(sites) == top:
+                        break
+                    if (stat.size_diff > 0 and
+                            frame.filename != tracemalloc.__file__):
+                        sites.append(('{}:{}'.format(frame.filename,
+                                                     frame.lineno),
+                                      stat.size_diff))
+            with _MEMORY_LOCK:
+                _MEMORY_CALLS[:] = [x for x in _MEMORY_CALLS if x is not call]
+                if not _MEMORY_CALLS and _MEMORY_TRACING['started']:
+                    tracemalloc.stop()
+                    _MEMORY_TRACING['started'] = False
+
+            name = '{}.{}'.format(wrapped.__module__, wrapped.__qualname__)
+            CALL_REGISTRY.add_memory(name, peak - start, end - start, sites)
+            if verbose:
+                print('Memory: {}\t(peak: {} B, net: {} B)'.format(
+                    wrapped.__name__, peak - start, end - start))
+
+    return wrapper
+
+
+def open_records(path: str, cols: Union[Tuple[str], None]=None,
+                 where: Union[dict, None]=None) -> np.ndarray:
+    """Load records saved with :func:`save_records`.
+
+    .. note:: Only the column files of the requested fields and of the \
+        fields in argument "where" are read. Uncompressed columns are \
+        memory-mapped, so only the required bytes are loaded from disk.
+
+    .. note:: Argument "where" maps field names to inclusive (low, high) \
+        bounds, either of which may be None. If the saved minimum and \
+        maximum of a field show that no record can match, an empty array \
+        is returned without reading any column.
+
+    :param str path: path to the record directory
+    :param tuple cols: names of fields to load (default: None will load all \
+        fields)
+    :param dict where: field names and (low, high) bounds that records \
+        must satisfy (default: None will return all records)
+    :returns: record array of the requested fields
+    :rtype: ndarray
+    :raises: KeyError
+
+    **Example**:
+
+        * Load two fields for the records where z is at least zero.
+
+    ::
+
+        records = open_records('results.rec', cols=('x', 'y'),
+                               where={'z': (0, None)})
+    """
+    with open(os.path.join(path, RECORDS_META), 'r') as f:
+        meta = json.load(f)
+    fields = collections.OrderedDict((x['name'], x) for x in meta['fields'])
+    cols = list(fields) if cols is None else check_list(cols)
+    where = where if where else {}
+
+    for name in itertools.chain(cols, where):
+        if name not in fields:
+            raise KeyError('Field not found in records: {}'.format(name))
+
+    dtype = {'names': cols, 'formats': [fields[x]['format'] for x in cols]}
+    if not _records_overlap(fields, where):
+        return np.empty(0, dtype=dtype)
+
+    columns = {}
+
+    def column(name):
+        if name not in columns:
+            columns[name] = _load_column(path, fields[name],
+                                         meta['compressed'])
+        return columns[name]
+
+    mask = None
+    for name, (low, high) in where.items():
+        keep = _range_mask(column(name), low, high)
+        mask = keep if mask is None else mask & keep
+
+    size = meta['rows'] if mask is None else int(np.count_nonzero(mask))
+    records = np.empty(size, dtype=dtype)
+    for name in cols:
+        values = column(name)
+        records[name] = values if mask is None else values[mask]
+
+    return records
+
+
+def _load_column(path: str, field: dict, compressed: bool) -> np.ndarray:
+    """Load a single column file of a record directory.
+
+    :param str path: path to the record directory
+    :param dict field: metadata of the field
+    :param bool compressed: column files are gzip compressed
+    :returns: values of the column
+    :rtype: ndarray
+    """
+    column_path = os.path.join(path, field['file'])
+    if compressed:
+        with gzip.open(column_path, 'rb') as f:
+            return np.load(f)
+    return np.load(column_path, mmap_mode='r')
+
+
+def _range_mask(values: np.ndarray, low: Any, high: Any) -> np.ndarray:
+    """Return a boolean mask of values within inclusive bounds.
+
+    :param ndarray values: values to test
+    :param low: lower bound or None
+    :param high: upper bound or None
+    :returns: True where the value is within the bounds
+    :rtype: ndarray
+    """
+    mask = np.ones(values.shape, dtype=bool)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def _records_overlap(fields: dict, where: dict) -> bool:
+    """Test if saved column statistics allow records to match the bounds.
+
+    :param dict fields: metadata of each field
+    :param dict where: field names and (low, high) bounds
+    :returns: False if the bounds exclude every record
+    :rtype: bool
+    """
+    for name, (low, high) in where.items():
+        minimum, maximum = fields[name]['min'], fields[name]['max']
+        if minimum is None:
+            continue
+        if low is not None and maximum < low:
+            return False
+        if high is not None and minimum > high:
+            return False
+    return True
 
 
 def preserve_cwd(working_dir: str):
@@ -209,59 +2502,771 @@ def preserve_cwd(working_dir: str):
     return wrapper
 
 
-def status():
-    """Decorator: Provide execution and completion status to terminal."""
-    @wrapt.decorator
+def save_records(path: str, records: np.ndarray, compress: bool=False):
+    """Save a record array as a directory of column files.
+
+    Each field is written to its own .npy file alongside a JSON metadata \
+    file holding the field names, formats, row count and the minimum and \
+    maximum of every numeric field.
+
+    .. note:: Compressed column files use gzip and are read into memory \
+        by :func:`open_records` instead of being memory-mapped.
+
+    :param str path: path to the record directory
+    :param ndarray records: record array to save
+    :param bool compress: compress each column file (default: False)
+    """
+    records = np.atleast_1d(records)
+    os.makedirs(path, exist_ok=True)
+
+    fields = []
+    for idx, name in enumerate(records.dtype.names):
+        values = records[name]
+        suffix = '.gz' if compress else ''
+        field = {'name': name, 'format': values.dtype.str,
+                 'file': 'col_{}.npy{}'.format(idx, suffix),
+                 'min': None, 'max': None}
+        if values.dtype.kind in 'biuf' and values.size:
+            finite = values[~np.isnan(values)] if values.dtype.kind == 'f' \
+                else values
+            if finite.size:
+                field['min'] = finite.min().item()
+                field['max'] = finite.max().item()
+        fields.append(field)
+
+        column_path = os.path.join(path, field['file'])
+        temp_path = '{}.{}.tmp'.format(column_path, os.getpid())
+        opener = gzip.open if compress else open
+        with opener(temp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(values))
+        os.replace(temp_path, column_path)
+
+    meta_path = os.path.join(path, RECORDS_META)
+    with open('{}.tmp'.format(meta_path), 'w') as f:
+        json.dump({'version': 1, 'rows': records.size, 'compressed': compress,
+                   'fields': fields}, f, indent=2)
+    os.replace('{}.tmp'.format(meta_path), meta_path)
+
+
+def scan_dir(path: Union[str, None]=None, search: str='',
+             pattern: Union[str, None]=None, regex: Union[str, None]=None,
+             suffix: Union[str, Tuple[str], None]=None,
+             min_size: Union[int, None]=None,
+             max_size: Union[int, None]=None,
+             newer: Union[float, None]=None, older: Union[float, None]=None,
+             exclude: Union[str, Tuple[str], None]=None,
+             workers: int=1) -> Iterator[str]:
+    """Yield paths of files below a directory that satisfy every filter.
+
+    .. note:: Directories are read with os.scandir. If argument "workers" \
+        is greater than one, subdirectories are read concurrently on a \
+        thread pool. Paths are yielded as they are found, in no particular \
+        order.
+
+    .. note:: File size and modification time are only read from disk when \
+        a size or time filter is supplied.
+
+    .. note:: As with os.walk, symbolic links to directories are neither \
+        returned nor followed, while symbolic links to files are returned.
+
+    :param str path: directory to search (default: None will use the \
+        current directory)
+    :param str search: string of characters the file names must contain \
+        (default: '' will match all files)
+    :param str pattern: glob pattern the file names must match \
+        (default: None)
+    :param str regex: regular expression searched for in the file names \
+        (default: None)
+    :param suffix: ending or endings of the file names (default: None)
+    :type: str tuple
+    :param int min_size: minimum file size in bytes (default: None)
+    :param int max_size: maximum file size in bytes (default: None)
+    :param float newer: files must be modified at or after this epoch time \
+        (default: None)
+    :param float older: files must be modified at or before this epoch time \
+        (default: None)
+    :param exclude: glob pattern or patterns of directory names that are \
+        not entered (default: None)
+    :type: str tuple
+    :param int workers: number of threads reading directories (default: 1)
+    :returns: paths to matching files
+    :rtype: generator
+
+    **Example**:
+
+        * Find large log files changed in the last day, skipping .git.
+
+    ::
+
+        for name in scan_dir('runs', suffix='.log', min_size=2 ** 20,
+                             newer=time.time() - 86400, exclude='.git'):
+            print(name)
+    """
+    path = os.getcwd() if path is None else path
+    suffix = tuple(check_list(suffix)) if suffix else None
+    exclude = check_list(exclude) if exclude else []
+    compiled = re.compile(regex) if regex else None
+    need_stat = any(x is not None for x in (min_size, max_size, newer, older))
+
+    def match(entry):
+        name = entry.name
+        if search not in name:
+            return False
+        if suffix and not name.endswith(suffix):
+            return False
+        if pattern and not fnmatch.fnmatch(name, pattern):
+            return False
+        if compiled and not compiled.search(name):
+            return False
+        if need_stat:
+            try:
+                stat = entry.stat()
+            except OSError:
+                return False
+            if ((min_size is not None and stat.st_size < min_size) or
+                    (max_size is not None and stat.st_size > max_size) or
+                    (newer is not None and stat.st_mtime < newer) or
+                    (older is not None and stat.st_mtime > older)):
+                return False
+        return True
+
+    def scan(directory):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                        is_link = is_dir and entry.is_symlink()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not is_link and not any(
+                                fnmatch.fnmatch(entry.name, x)
+                                for x in exclude):
+                            subdirs.append(entry.path)
+                    elif match(entry):
+                        files.append(entry.path)
+        except OSError:
+            pass
+        return files, subdirs
+
+    if workers <= 1:
+        pending = [path]
+        while pending:
+            files, subdirs = scan(pending.pop())
+            yield from files
+            pending.extend(reversed(subdirs))
+        return
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {executor.submit(scan, path)}
+        while running:
+            done, running = futures.wait(running,
+                                         return_when=futures.FIRST_COMPLETED)
+            for job in done:
+                files, subdirs = job.result()
+                running.update(executor.submit(scan, x) for x in subdirs)
+                yield from files
+
+
+def search_files(paths: Union[str, List[str]], target: Union[str, bytes],
+                 regex: bool=False, ignore_case: bool=False,
+                 decompress: bool=True,
+                 workers: Union[int, None]=None) -> List[Match]:
+    """Find the first occurrence of a string or regular expression in files.
+
+    .. note:: Uncompressed files are memory mapped and searched in place. \
+        Files compressed with a codec in CODECS are decompressed while \
+        searching one block of whole lines at a time, so a regular \
+        expression in a compressed file will not match across lines.
+
+    .. note:: Searching a file stops at its first match. Files are searched \
+        concurrently on a process pool unless argument "workers" is 1.
+
+    :param paths: paths to files to search or a search string passed to \
+        :func:`walk_dir`
+    :type: str list
+    :param target: text or regular expression to find
+    :type: str bytes
+    :param bool regex: treat argument "target" as a regular expression, \
+        where ^ and $ match at line boundaries (default: False)
+    :param bool ignore_case: ignore the case of letters (default: False)
+    :param bool decompress: search the decompressed content of compressed \
+        files (default: True)
+    :param int workers: number of processes (default: None will use the \
+        executor default)
+    :returns: path, one based line number and byte offset of the first \
+        match in each matching file, in the order of argument "paths"; \
+        offsets in compressed files refer to the decompressed content
+    :rtype: list
+
+    **Example**:
+
+        * Find the run logs that reported a failed solve.
+
+    ::
+
+        for match in search_files('run_', 'did not converge'):
+            print(match.path, match.line)
+    """
+    if isinstance(paths, str):
+        paths = walk_dir(paths)
+    pattern = target.encode() if isinstance(target, str) else target
+    if not regex:
+        pattern = re.escape(pattern)
+    search = functools.partial(_search_file, pattern=pattern,
+                               flags=re.MULTILINE | (re.IGNORECASE if
+                                                     ignore_case else 0),
+                               decompress=decompress)
+
+    if workers == 1:
+        found = [search(x) for x in paths]
+    else:
+        chunk = max(1, len(paths) // (8 * (workers or os.cpu_count() or 1)))
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            found = list(executor.map(search, paths, chunksize=chunk))
+
+    return [x for x in found if x is not None]
+
+
+def _search_file(path: str, pattern: bytes, flags: int, decompress: bool,
+                 block_size: int=2 ** 24) -> Union[Match, None]:
+    """Return the first match of a regular expression in a file.
+
+    :param str path: path to file
+    :param bytes pattern: regular expression
+    :param int flags: regular expression flags
+    :param bool decompress: search the decompressed content of compressed \
+        files
+    :param int block_size: number of bytes copied at once when counting \
+        lines, or read at once from compressed files (default: 16 MB)
+    :returns: location of the first match or None if there is no match
+    :rtype: Match or None
+    """
+    compiled = re.compile(pattern, flags)
+    try:
+        if decompress and _compression(path):
+            with _open_file(path, 'rb') as f:
+                return _search_stream(path, f, compiled, block_size)
+
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                found = compiled.search(mm)
+                if found is None:
+                    return None
+                offset = found.start()
+                lines = 1
+                for start in range(0, offset, block_size):
+                    lines += mm[start:min(start + block_size,
+                                          offset)].count(b'\n')
+                return Match(path, lines, offset)
+    except OSError:
+        return None
+
+
+def _search_stream(path: str, f: IO, compiled: Any,
+                   block_size: int=2 ** 24) -> Union[Match, None]:
+    """Return the first match of a regular expression in a binary stream.
+
+    :param str path: path reported in the match
+    :param f: binary file object
+    :type: file
+    :param compiled: compiled regular expression
+    :type: re.Pattern
+    :param int block_size: number of bytes read at once (default: 16 MB)
+    :returns: location of the first match or None if there is no match
+    :rtype: Match or None
+    """
+    lines = 0
+    consumed = 0
+    carry = b''
+    while True:
+        block = f.read(block_size)
+        data = carry + block
+        stop = data.rfind(b'\n') + 1 if block else len(data)
+        if block and not stop:
+            carry = data
+            continue
+
+        found = compiled.search(data, 0, stop)
+        if found:
+            offset = found.start()
+            return Match(path, lines + data.count(b'\n', 0, offset) + 1,
+                         consumed + offset)
+        if not block:
+            return None
+
+        lines += data.count(b'\n', 0, stop)
+        consumed += stop
+        carry = data[stop:]
+
+
+def status(timing: bool=False, verbose: bool=True,
+           enabled: Union[bool, Callable[[], bool], None]=True):
+    """Decorator: Provide execution and completion status to terminal.
+
+    .. note:: Run times are measured with time.perf_counter_ns.
+
+    :param bool timing: record the run time of every call in \
+        CALL_REGISTRY (default: False)
+    :param bool verbose: print the execution and completion status \
+        (default: True)
+    :param enabled: if False the function is returned undecorated; a \
+        callable is checked before every call; None checks \
+        CALL_REGISTRY.enabled before every call (default: True)
+    :type: bool function None
+
+    **Example**:
+
+        * Collect timing statistics that can be switched off at run time.
+
+    ::
+
+        @status(timing=True, verbose=False, enabled=None)
+        def step():
+            ...
+
+        CALL_REGISTRY.enabled = False
+    """
+    if enabled is None:
+        def enabled():
+            return CALL_REGISTRY.enabled
+
+    @wrapt.decorator(enabled=enabled)
     def wrapper(wrapped, instance, args, kwargs):
-        print('\nExecute: {}'.format(wrapped.__name__))
-        start = dt.datetime.now()
+        if verbose:
+            print('\nExecute: {}'.format(wrapped.__name__))
+        start = time.perf_counter_ns()
         try:
             return wrapped(*args, **kwargs)
         finally:
-            finish = dt.datetime.now()
-            run_time = finish - start
-            print('Completed: {}\t(runtime: {})'.format(wrapped.__name__,
-                                                        run_time))
+            run_time = time.perf_counter_ns() - start
+            if timing:
+                CALL_REGISTRY.add_time('{}.{}'.format(wrapped.__module__,
+                                                      wrapped.__qualname__),
+                                       run_time)
+            if verbose:
+                print('Completed: {}\t(runtime: {})'.format(
+                    wrapped.__name__,
+                    dt.timedelta(microseconds=run_time // 1000)))
 
     return wrapper
 
 
-def unzip_file(path: str):
-    """Decompress read file using gzip.
+def stream_records(path: str, chunk_rows: int=100000,
+                   header_row: Union[int, None]=None, skip_rows: int=0,
+                   cols: Tuple[Union[str, int]]=('all',),
+                   names: Union[tuple, None]=None,
+                   formats: Union[tuple, str]=('f8', ),
+                   sample_rows: int=1000, where: Union[dict, None]=None,
+                   predicate: Union[Callable, None]=None
+                   ) -> Iterator[np.ndarray]:
+    """Load ascii file as a series of record arrays with bounded length.
+
+    .. note:: Arguments match :func:`load_records`. Blank lines and \
+        comments are not counted as rows, so every chunk except the last \
+        holds exactly chunk_rows records.
+
+    .. note:: If argument "where" or "predicate" is supplied each chunk is \
+        filtered as it is parsed, chunks may hold fewer than chunk_rows \
+        records and chunks without matches are not returned.
+
+    .. note:: Files compressed with gzip, bz2 or xz are detected from their \
+        leading bytes and decompressed while reading.
+
+    :param str path: path to file to load
+    :param int chunk_rows: maximum number of records in each chunk \
+        (default: 100000)
+    :param int header_row: row of file that contains the column headers \
+        (default: None)
+    :param int skip_rows: number of header rows to skip at beginning of file \
+        (default: 0)
+    :param tuple cols: tuple of columns to be loaded as records \
+        (default: 'all' will load all columns)
+    :param tuple names: names to be assigned to each column
+    :param formats: format to be assigned to each column or 'infer' to \
+        select the narrowest format for each column from a sample of rows
+    :type: tuple str
+    :param int sample_rows: number of rows examined when formats='infer' \
+        (default: 1000)
+    :param dict where: field names and inclusive (low, high) bounds that \
+        records must satisfy, either bound may be None (default: None)
+    :param predicate: function accepting a record array and returning a \
+        boolean mask of the records to keep (default: None)
+    :type: function or None
+    :returns: record arrays of consecutive rows of the requested file
+    :rtype: generator
+
+    **Example**:
+
+        * Sum the first column of a large file one million rows at a time.
+
+    ::
+
+        total = 0
+        for chunk in stream_records('example.txt', chunk_rows=1000000):
+            total += chunk['0'].sum()
+    """
+    chunk_rows = int(chunk_rows)
+    if chunk_rows < 1:
+        raise ValueError('chunk_rows must be a positive integer')
+
+    cols, dtype = _record_dtype(path, header_row, cols, names, formats,
+                                skip_rows, sample_rows)
+    return _stream_rows(path, skip_rows, cols, dtype, chunk_rows, where,
+                        predicate)
+
+
+def _stream_rows(path: str, skip_rows: int, cols: List[int], dtype: dict,
+                 chunk_rows: int, where: Union[dict, None]=None,
+                 predicate: Union[Callable, None]=None
+                 ) -> Iterator[np.ndarray]:
+    """Parse an ascii file into filtered record arrays of bounded length.
+
+    :param str path: path to file
+    :param int skip_rows: number of rows at the beginning of the file to omit
+    :param list cols: column indices to load
+    :param dict dtype: names and formats of the columns
+    :param int chunk_rows: maximum number of records parsed at a time
+    :param dict where: field names and inclusive (low, high) bounds \
+        (default: None)
+    :param predicate: function returning a boolean mask of records to keep \
+        (default: None)
+    :type: function or None
+    :returns: record arrays of consecutive matching rows
+    :rtype: generator
+    """
+    with _open_file(path, 'rb') as f:
+        for _ in itertools.islice(f, skip_rows):
+            pass
+        yield from _filter_lines(f, cols, dtype, 'loadtxt', chunk_rows,
+                                 where, predicate)
+
+
+def unzip_dir(path: str, search: str='', workers: Union[int, None]=None
+              ) -> List[ZipSummary]:
+    """Decompress every archive below a directory using a process pool.
+
+    .. note:: Only files whose leading bytes match a codec in CODECS and \
+        whose name ends with that codec's extension are decompressed. Files \
+        whose decompressed output already exists and is newer than the \
+        archive are skipped.
+
+    :param str path: path to directory
+    :param str search: string of characters the file names must contain \
+        (default: '' will match all files)
+    :param int workers: number of processes (default: None will use the \
+        number of processors)
+    :returns: summary of each file found
+    :rtype: list
+    """
+    return _map_dir(_unzip_one, path, search, workers)
+
+
+def _unzip_one(path: str) -> ZipSummary:
+    """Decompress one file unless it is not compressed or already done.
+
+    :param str path: path to file
+    :returns: summary of the operation
+    :rtype: ZipSummary
+    """
+    codec = _compression(path)
+    skipped = codec is None or not path.endswith(CODECS[codec].extension)
+    if not skipped:
+        target = path[:-len(CODECS[codec].extension)]
+        skipped = (os.path.isfile(target) and
+                   os.path.getmtime(target) >= os.path.getmtime(path))
+    return _timed_zip(unzip_file, path, skipped)
+
+
+def unzip_file(path: str) -> str:
+    """Decompress read file.
+
+    .. note:: The codec is detected from the leading bytes of the file and \
+        may be any codec in CODECS. The output path is the input path \
+        without the codec extension.
+
+    .. note:: The output is written to a temporary file and renamed when \
+        complete, so an interrupted call never leaves a partial file.
 
     :param str path: path to file to be unzipped
+    :returns: path to the decompressed file
+    :rtype: str
+    :raises: ValueError
     """
-    with gzip.open(path, 'rb') as f_in, open(path.rstrip('.gz'), 'wb') as f_out:
-        shutil.copyfileobj(f_in, f_out)
+    codec = _compression(path)
+    if codec is None:
+        raise ValueError('File is not compressed: {}'.format(path))
+
+    extension = CODECS[codec].extension
+    if path.endswith(extension):
+        target = path[:-len(extension)]
+    else:
+        target = os.path.splitext(path)[0]
+    if target == path:
+        target = '{}.out'.format(path)
+
+    temp_path = '{}.{}.tmp'.format(target, os.getpid())
+    try:
+        with CODECS[codec].reader(path, 'rb') as f_in, \
+                open(temp_path, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        _replace_synced(temp_path, target)
+    finally:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
 
     os.remove(path)
+    return target
 
 
-def walk_dir(search: str) -> List[str]:
+def walk_dir(search: str='', **kwargs) -> List[str]:
     """Walk the dir system looking for files that contain the search string.
 
     .. note:: Search will begin in the current directory.
 
     :param str search: string of characters to look for in the file names
+    :param kwargs: additional filter and traversal options passed to \
+        :func:`scan_dir`
     :returns: paths to files that matched the search string
     :rtype: list
     """
-    output = []
-    for root, _, files in os.walk(os.getcwd()):
-        for f in files:
-            if search in f:
-                output.append(os.path.join(root, f))
+    return sorted(scan_dir(search=search, **kwargs))
+
+
+def zip_dir(path: str, search: str='', workers: Union[int, None]=None,
+            level: Union[int, None]=None, codec: str='gzip'
+            ) -> List[ZipSummary]:
+    """Compress every file below a directory using a process pool.
+
+    .. note:: Files that are already compressed (detected from their \
+        leading bytes) are skipped, as are files with an existing archive \
+        newer than the file.
+
+    :param str path: path to directory
+    :param str search: string of characters the file names must contain \
+        (default: '' will match all files)
+    :param int workers: number of processes (default: None will use the \
+        number of processors)
+    :param int level: compression level (default: None will use the codec \
+        default)
+    :param str codec: name of a codec in CODECS or 'auto' (default: gzip)
+    :returns: summary of each file found
+    :rtype: list
 
-    return sorted(output)
+    **Example**:
+
+        * Compress all output files and report the space saved.
+
+    ::
+
+        summary = zip_dir('results', search='.out')
+        saved = sum(x.bytes_in - x.bytes_out for x in summary)
+    """
+    return _map_dir(functools.partial(_zip_one, level=level, codec=codec),
+                    path, search, workers)
 
 
-def zip_file(path: str):
+def _zip_one(path: str, level: Union[int, None]=None,
+             codec: str='gzip') -> ZipSummary:
+    """Compress one file unless it is compressed or already archived.
+
+    :param str path: path to file
+    :param int level: compression level (default: None will use the codec \
+        default)
+    :param str codec: name of a codec in CODECS or 'auto' (default: gzip)
+    :returns: summary of the operation
+    :rtype: ZipSummary
+    """
+    extensions = ([x.extension for x in CODECS.values()] if codec == 'auto'
+                  else [CODECS[codec].extension])
+    targets = ['{}{}'.format(path, x) for x in extensions]
+    skipped = (_compression(path) is not None or
+               any(os.path.isfile(x) and
+                   os.path.getmtime(x) >= os.path.getmtime(path)
+                   for x in targets))
+    return _timed_zip(functools.partial(zip_file, level=level, codec=codec),
+                      path, skipped)
+
+
+def _map_dir(func: Callable, path: str, search: str,
+             workers: Union[int, None]) -> List[ZipSummary]:
+    """Apply a function to every matching file below a directory.
+
+    :param func: function accepting a file path and returning a summary
+    :type: function
+    :param str path: path to directory
+    :param str search: string of characters the file names must contain
+    :param int workers: number of processes
+    :returns: summary of each file in sorted path order
+    :rtype: list
+    """
+    paths = sorted(os.path.join(root, f)
+                   for root, _, files in os.walk(path)
+                   for f in files if search in f)
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, paths))
+
+
+def _replace_synced(temp_path: str, target: str):
+    """Move a finished temporary file over its target durably.
+
+    .. note:: The temporary file is flushed to disk before the rename and \
+        the directory is flushed after it, so a crash cannot leave the \
+        target truncated once the caller removes the source file.
+
+    :param str temp_path: path to the completely written temporary file
+    :param str target: path the file is moved to
+    """
+    with open(temp_path, 'r+b') as f:
+        os.fsync(f.fileno())
+    os.replace(temp_path, target)
+
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(target)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _select_codec(path: str, level: Union[int, None]=None,
+                  min_mb_per_s: Union[float, None]=None,
+                  sample_size: int=2 ** 22) -> str:
+    """Choose the codec with the best ratio within a throughput budget.
+
+    .. note:: Up to four blocks spread across the file, totaling at most \
+        "sample_size" bytes, are compressed with every codec in CODECS.
+
+    :param str path: path to file
+    :param int level: compression level (default: None will use the codec \
+        default)
+    :param float min_mb_per_s: minimum acceptable compression throughput \
+        (default: None will accept any throughput)
+    :param int sample_size: number of bytes to sample (default: 4 MB)
+    :returns: name of the selected codec, or the fastest codec if none \
+        meet the throughput budget
+    :rtype: str
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if file_size <= sample_size:
+            sample = f.read()
+        else:
+            block = sample_size // 4
+            pieces = []
+            for start in np.linspace(0, file_size - block, 4, dtype=np.int64):
+                f.seek(int(start))
+                pieces.append(f.read(block))
+            sample = b''.join(pieces)
+
+    trials = []
+    for name, codec in CODECS.items():
+        start = time.perf_counter()
+        size = len(codec.compress(sample, codec.level if level is None else
+                                  level))
+        seconds = max(time.perf_counter() - start, 1e-9)
+        trials.append((len(sample) / max(size, 1), len(sample) / 1e6 /
+                       seconds, name))
+
+    allowed = [x for x in trials
+               if min_mb_per_s is None or x[1] >= min_mb_per_s]
+    if not allowed:
+        return max(trials, key=lambda x: x[1])[2]
+    return max(allowed, key=lambda x: x[0])[2]
+
+
+def _timed_zip(func: Callable, path: str, skipped: bool) -> ZipSummary:
+    """Run a compression function and summarize the result.
+
+    :param func: function accepting the path to the file and returning the \
+        path to the output file
+    :type: function
+    :param str path: path to the input file
+    :param bool skipped: do not call the function
+    :returns: summary of the operation
+    :rtype: ZipSummary
+    """
+    bytes_in = os.path.getsize(path)
+    if skipped:
+        return ZipSummary(path, bytes_in, 0, 0.0, True)
+
+    start = time.perf_counter()
+    target = func(path)
+    seconds = time.perf_counter() - start
+    return ZipSummary(path, bytes_in, os.path.getsize(target), seconds, False)
+
+
+def zip_file(path: str, level: Union[int, None]=None, workers: int=1,
+             block_size: int=2 ** 24, codec: str='gzip',
+             min_mb_per_s: Union[float, None]=None) -> str:
     """Compress read file using zip.
 
+    .. note:: Argument "codec" may be any codec in CODECS (gzip, bz2, lzma \
+        and zstd when the zstandard package is installed) or 'auto'. The \
+        'auto' codec compresses a sample of the file with every codec and \
+        selects the best compression ratio among the codecs at least as \
+        fast as "min_mb_per_s".
+
+    .. note:: If argument "workers" is greater than one the file is split \
+        into blocks that are compressed concurrently on a thread pool and \
+        written in order as a multi-member stream, which the command line \
+        tools and :func:`unzip_file` read as a single file.
+
+    .. note:: The output is written to a temporary file and renamed when \
+        complete, so an interrupted call never leaves a partial archive.
+
     :param str path: path to file to be zipped
+    :param int level: compression level (default: None will use the codec \
+        default, 9 for gzip and bz2, 6 for lzma and 3 for zstd)
+    :param int workers: number of threads compressing blocks (default: 1)
+    :param int block_size: number of uncompressed bytes in each block when \
+        workers is greater than one (default: 16 MB)
+    :param str codec: name of a codec in CODECS or 'auto' (default: gzip)
+    :param float min_mb_per_s: minimum compression throughput used by the \
+        'auto' codec (default: None will select the best ratio)
+    :returns: path to the compressed file
+    :rtype: str
+    :raises: ValueError
     """
-    with open(path, 'rb') as f_in, \
-            gzip.open('{}.gz'.format(path), 'wb') as f_out:
-        shutil.copyfileobj(f_in, f_out)
+    if codec == 'auto':
+        codec = _select_codec(path, level, min_mb_per_s)
+    if codec not in CODECS:
+        raise ValueError('Unknown codec: {}'.format(codec))
+    codec = CODECS[codec]
+    level = codec.level if level is None else level
+
+    target = '{}{}'.format(path, codec.extension)
+    temp_path = '{}.{}.tmp'.format(target, os.getpid())
+    try:
+        if workers <= 1:
+            with open(path, 'rb') as f_in, \
+                    codec.writer(temp_path, level) as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        else:
+            with open(path, 'rb') as f_in, open(temp_path, 'wb') as f_out, \
+                    futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = collections.deque()
+                for block in iter(lambda: f_in.read(block_size), b''):
+                    pending.append(pool.submit(codec.compress, block, level))
+                    if len(pending) > 2 * workers:
+                        f_out.write(pending.popleft().result())
+                while pending:
+                    f_out.write(pending.popleft().result())
+                if not f_out.tell():
+                    f_out.write(codec.compress(b'', level))
+        _replace_synced(temp_path, target)
+    finally:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
 
     os.remove(path)
+    return target
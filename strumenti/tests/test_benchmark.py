@@ -0,0 +1,74 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""benchmark.py Unit Tests
+
+..moduleauthor:: Timothy Helton <timothy.j.helton@gmail.com>
+"""
+
+import os.path as osp
+
+import numpy as np
+import pytest
+
+from strumenti import benchmark
+
+
+# Test compare
+base = {'load_file': {'mb_per_s': 100.0, 'rows_per_s': 1000.0,
+                      'peak_bytes': 1000}}
+compare = {'no change': ({'load_file': base['load_file']}, []),
+           'small change': ({'load_file': {'mb_per_s': 95.0,
+                                           'rows_per_s': 950.0,
+                                           'peak_bytes': 1050}}, []),
+           'slower': ({'load_file': {'mb_per_s': 50.0, 'rows_per_s': 1000.0,
+                                     'peak_bytes': 1000}},
+                      ['load_file: mb_per_s 100 -> 50 (-50.0%)']),
+           'more memory': ({'load_file': {'mb_per_s': 100.0,
+                                          'rows_per_s': 1000.0,
+                                          'peak_bytes': 2000}},
+                           ['load_file: peak_bytes 1000 -> 2000 (+100.0%)']),
+           'new benchmark': ({'walk_dir': {'mb_per_s': 1.0}}, []),
+           }
+
+
+@pytest.mark.parametrize('results, expected',
+                         list(compare.values()),
+                         ids=list(compare.keys()))
+def test__compare(results, expected):
+    assert benchmark.compare(results, base, threshold=0.1) == expected
+
+
+# Test generate_data
+def test__generate_data(tmpdir):
+    paths = benchmark.generate_data(str(tmpdir), rows=5, cols=3, files=4,
+                                    depth=2)
+    assert len(paths) == 4
+    assert all(osp.isfile(x) for x in paths)
+    assert osp.isdir(osp.join(str(tmpdir), 'level_0', 'level_1'))
+    data = np.loadtxt(paths[0], skiprows=1)
+    assert data.shape == (5, 3)
+
+
+# Test measure
+def test__measure():
+    result = benchmark.measure(np.zeros, 1000, size_bytes=8000, rows=1000,
+                               repeat=2)
+    assert result['seconds'] > 0
+    assert result['mb_per_s'] == pytest.approx(8000 / 1e6 /
+                                               result['seconds'])
+    assert result['peak_bytes'] >= 8000
+
+
+# Test run_suite, save_baseline and load_baseline
+def test__run_suite(tmpdir):
+    work_dir = osp.join(str(tmpdir), 'bench')
+    results = benchmark.run_suite(work_dir, rows=10, cols=2, files=3,
+                                  depth=1, repeat=1)
+    assert set(results) == {'load_file', 'load_records', 'get_header',
+                            'zip_file', 'unzip_file', 'walk_dir'}
+    assert not osp.exists(work_dir)
+
+    baseline = osp.join(str(tmpdir), 'baseline.json')
+    benchmark.save_baseline(results, baseline)
+    assert benchmark.load_baseline(baseline) == results
@@ -6,11 +6,24 @@
 ..moduleauthor:: Timothy Helton <timothy.j.helton@gmail.com>
 """
 
+import bz2
+import collections
+from concurrent import futures
+import gzip
+import io
+import json
 import logging
+import logging.handlers
+import lzma
 import os
 import os.path as osp
+import queue
+import re
 import shutil
 import subprocess
+import threading
+import time
+import tracemalloc
 
 import pytest
 import numpy as np
@@ -23,6 +36,53 @@ from strumenti import system
 lines = ['a\tb\tc\td\n', '\n', '1\t2\t3\t4\n', '5\t6\t7\t8\n']
 
 
+# Test CallRegistry
+class TestCallRegistry:
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.registry = system.CallRegistry()
+
+    @pytest.mark.parametrize('value', [0, 15, 31, 32, 1000, 123456789])
+    def test__bucket(self, value):
+        middle = self.registry._bucket_value(self.registry._bucket(value))
+        assert abs(middle - value) <= value * 0.032
+
+    def test__stats(self):
+        for value in range(1, 1001):
+            self.registry.add_time('f', value * 1000)
+        timing = self.registry.stats()['f']['timing']
+        assert timing['count'] == 1000
+        assert timing['total_ns'] == 500500000
+        assert (timing['min_ns'], timing['max_ns']) == (1000, 1000000)
+        for key, expected in (('p50_ns', 5e5), ('p95_ns', 9.5e5),
+                              ('p99_ns', 9.9e5)):
+            assert timing[key] == pytest.approx(expected, rel=0.04)
+
+    def test__report(self):
+        self.registry.add_time('f', 2000)
+        table = self.registry.report().splitlines()
+        assert table[0].split()[:2] == ['function', 'calls']
+        assert table[1].split() == ['f', '1'] + ['2.0'] * 6
+        assert json.loads(self.registry.report('json')) == \
+            self.registry.stats()
+        with pytest.raises(ValueError):
+            self.registry.report('csv')
+
+    def test__memory(self):
+        self.registry.add_memory('g', 300, 100, [('a.py:1', 200)])
+        self.registry.add_memory('g', 100, -50, [('a.py:1', 50),
+                                                 ('b.py:2', 60)])
+        memory = self.registry.stats()['g']['memory']
+        assert memory == {'count': 2, 'peak_max_bytes': 300,
+                          'peak_mean_bytes': 200, 'net_max_bytes': 100,
+                          'net_total_bytes': 50,
+                          'top_sites': [['a.py:1', 250], ['b.py:2', 60]]}
+        assert self.registry.report().splitlines()[1].split() == \
+            ['g', '2', '0.3', '0.2', '0.1', '0.1', 'a.py:1']
+        assert system.CallRegistry().report() == ''
+
+
 # Test check_list
 check_list = {'string': ('test', ['test']),
               'tuple': (('test', 'tuple'), ['test', 'tuple']),
@@ -37,6 +97,225 @@ def test__check_list(variable, expected):
     assert system.check_list(variable) == expected
 
 
+# Test FileIndex
+class TestFileIndex:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        os.makedirs(osp.join('tree', 'a', 'b'))
+        for name in ('tree/one.txt', 'tree/a/two.txt', 'tree/a/b/three.log'):
+            with open(name, 'w') as f:
+                f.write('x' * 10)
+        self.root = osp.abspath('tree')
+        self.index = system.FileIndex('tree')
+        yield
+        self.index.close()
+
+    def paths(self, *names):
+        return sorted(osp.join(self.root, x) for x in names)
+
+    def test__refresh(self):
+        assert self.index.refresh() == 3
+        assert len(self.index) == 3
+        assert self.index.refresh() == 0
+        assert osp.isfile('{}.index.sqlite'.format(self.root))
+
+    def test__incremental(self):
+        self.index.refresh()
+        os.remove(osp.join('tree', 'a', 'two.txt'))
+        with open(osp.join('tree', 'a', 'b', 'four.txt'), 'w') as f:
+            f.write('')
+        assert self.index.refresh() == 2
+        assert self.index.search() == self.paths('one.txt', 'a/b/three.log',
+                                                 'a/b/four.txt')
+
+    def test__removed_directory(self):
+        self.index.refresh()
+        shutil.rmtree(osp.join('tree', 'a'))
+        self.index.refresh()
+        assert self.index.search() == self.paths('one.txt')
+
+    def test__symlinks(self):
+        os.symlink(osp.join(self.root, 'a'), osp.join('tree', 'a_link'))
+        os.symlink(osp.join(self.root, 'one.txt'), osp.join('tree', 'link'))
+        self.index.refresh()
+        assert self.index.search() == self.paths('one.txt', 'link',
+                                                 'a/two.txt', 'a/b/three.log')
+        assert self.index.search(min_size=10, max_size=10) == \
+            self.index.search()
+
+    def test__persistent(self):
+        self.index.refresh()
+        with system.FileIndex('tree') as index:
+            assert index.refresh() == 0
+            assert index.search('t') == self.paths('one.txt', 'a/two.txt',
+                                                   'a/b/three.log')
+
+    @pytest.mark.parametrize('kwargs, expected', [
+        ({'search': 'two'}, ['a/two.txt']),
+        ({'suffix': '.log'}, ['a/b/three.log']),
+        ({'pattern': 't*.txt'}, ['a/two.txt']),
+        ({'min_size': 11}, []),
+        ({'max_size': 10, 'suffix': '.txt'}, ['one.txt', 'a/two.txt']),
+        ({'older': 0}, []),
+        ])
+    def test__search(self, kwargs, expected):
+        self.index.refresh()
+        assert self.index.search(**kwargs) == self.paths(*expected)
+
+
+# Test find_duplicates
+class TestFindDuplicates:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        os.makedirs('sub')
+        files = {'a.txt': b'x' * 500, 'sub/b.txt': b'x' * 500,
+                 'c.txt': b'y' * 500, 'd.txt': b'x' * 499,
+                 'e.txt': b'z' * 100 + b'1' + b'z' * 100,
+                 'sub/f.txt': b'z' * 100 + b'2' + b'z' * 100,
+                 'g.txt': b'z' * 100 + b'1' + b'z' * 100,
+                 'empty_1.txt': b'', 'empty_2.txt': b''}
+        for name, data in files.items():
+            with open(name, 'wb') as f:
+                f.write(data)
+        self.cwd = os.getcwd()
+
+    def expected(self):
+        return [[osp.join(self.cwd, x) for x in group]
+                for group in (['a.txt', 'sub/b.txt'], ['e.txt', 'g.txt'])]
+
+    @pytest.mark.parametrize('block_size', [10, 2 ** 16])
+    def test__groups(self, block_size):
+        assert system.find_duplicates(block_size=block_size) == \
+            self.expected()
+
+    def test__empty(self):
+        found = system.find_duplicates(search='empty', min_size=0)
+        assert found == [[osp.join(self.cwd, 'empty_1.txt'),
+                          osp.join(self.cwd, 'empty_2.txt')]]
+
+    def test__cache(self):
+        system.find_duplicates(block_size=10, cache='hashes.json')
+        with open('hashes.json', 'r') as f:
+            hashes = json.load(f)
+        assert hashes[osp.join(self.cwd, 'e.txt')][3] is not None
+        assert osp.join(self.cwd, 'd.txt') not in hashes
+
+        for name in ('e.txt', 'sub/f.txt', 'g.txt'):
+            hashes[osp.join(self.cwd, name)][3] = 'cached'
+        with open('hashes.json', 'w') as f:
+            json.dump(hashes, f)
+        found = system.find_duplicates(block_size=10, cache='hashes.json')
+        assert found[1] == [osp.join(self.cwd, x)
+                            for x in ('e.txt', 'g.txt', 'sub/f.txt')]
+
+        hashes[osp.join(self.cwd, 'sub/f.txt')][1] += 1
+        with open('hashes.json', 'w') as f:
+            json.dump(hashes, f)
+        found = system.find_duplicates(block_size=10, cache='hashes.json')
+        assert found == self.expected()
+
+    def test__shared_cache(self):
+        system.find_duplicates(block_size=10, cache='hashes.json')
+        system.find_duplicates(path='sub', cache='hashes.json')
+        with open('hashes.json', 'r') as f:
+            hashes = json.load(f)
+        assert osp.join(self.cwd, 'e.txt') in hashes
+
+        os.remove('e.txt')
+        with open('a.txt', 'ab') as f:
+            f.write(b'x')
+        system.find_duplicates(path='sub', cache='hashes.json')
+        with open('hashes.json', 'r') as f:
+            hashes = json.load(f)
+        assert osp.join(self.cwd, 'e.txt') not in hashes
+        assert osp.join(self.cwd, 'a.txt') not in hashes
+        assert osp.join(self.cwd, 'g.txt') in hashes
+
+
+# Test FollowFile
+class TestFollowFile:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        with open('test.txt', 'w') as f:
+            f.write('x y\n1 2\n')
+
+    def append(self, text, mode='a'):
+        with open('test.txt', mode) as f:
+            f.write(text)
+
+    def test__read_lines(self):
+        follow = system.FollowFile('test.txt')
+        assert follow.read_lines() == ['x y\n', '1 2\n']
+        assert follow.read_lines() == []
+        self.append('3 4\n5')
+        assert follow.read_lines() == ['3 4\n']
+        self.append(' 6\n')
+        assert follow.read_lines() == ['5 6\n']
+
+    def test__missing_file(self):
+        assert system.FollowFile('missing.txt').read_lines() == []
+
+    def test__truncated(self):
+        follow = system.FollowFile('test.txt')
+        follow.read_lines()
+        self.append('7\n', mode='w')
+        assert follow.read_lines() == ['7\n']
+
+    def test__rotated(self):
+        follow = system.FollowFile('test.txt')
+        follow.read_lines()
+        os.rename('test.txt', 'test.txt.1')
+        self.append('a b\n9 9\n3 3\n', mode='w')
+        assert follow.read_lines() == ['a b\n', '9 9\n', '3 3\n']
+
+    def test__checkpoint(self):
+        system.FollowFile('test.txt', checkpoint='pos.json').read_lines()
+        self.append('3 4\n')
+        follow = system.FollowFile('test.txt', checkpoint='pos.json')
+        assert follow.read_lines() == ['3 4\n']
+
+    def test__read_records(self):
+        follow = system.FollowFile('test.txt')
+        first = list(follow.read_records(skip_rows=1, names=('x', 'y')))
+        self.append('3 4\n5 6\n7 8\n')
+        second = list(follow.read_records(chunk_rows=2, skip_rows=1))
+        assert [x.size for x in first] == [1]
+        assert np.all(first[0]['y'] == 2)
+        assert [x.size for x in second] == [2, 1]
+        assert np.all(second[0]['0'] == np.array([3.0, 5.0]))
+
+    def test__read_records_interrupted(self):
+        self.append('3 4\n5 6\n7 8\n')
+        follow = system.FollowFile('test.txt', checkpoint='pos.json')
+        chunks = follow.read_records(chunk_rows=2, skip_rows=1)
+        assert next(chunks)['0'].tolist() == [1.0, 3.0]
+        assert next(chunks)['0'].tolist() == [5.0, 7.0]
+        del chunks
+
+        follow = system.FollowFile('test.txt', checkpoint='pos.json')
+        chunks = list(follow.read_records(chunk_rows=2, skip_rows=1))
+        assert [x['0'].tolist() for x in chunks] == [[5.0, 7.0]]
+        assert list(follow.read_records(skip_rows=1)) == []
+
+    def test__read_records_split_header(self):
+        self.append('h1\n', mode='w')
+        follow = system.FollowFile('test.txt', checkpoint='pos.json')
+        assert list(follow.read_records(skip_rows=2)) == []
+        self.append('h2\n1 2\n')
+        follow = system.FollowFile('test.txt', checkpoint='pos.json')
+        chunks = list(follow.read_records(skip_rows=2))
+        assert [x['0'].tolist() for x in chunks] == [[1.0]]
+        self.append('h1\nh2\n3\n', mode='w')
+        chunks = list(follow.read_records(skip_rows=2))
+        assert [x['0'].tolist() for x in chunks] == [[3.0]]
+
+
 # Test get_header
 get_header = {'defaults': ({'path': 'test.txt', 'header_row': 0},
                            ['a', 'b', 'c', 'd']),
@@ -65,6 +344,42 @@ def test__get_header(kwargs, expected):
     assert system.get_header(**kwargs) == expected
 
 
+# Test GzipIndex
+class TestGzipIndex:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        self.text = b''.join(b'line %d\n' % x for x in range(2000))
+        with open('test.log', 'wb') as f:
+            f.write(self.text)
+
+    @pytest.mark.parametrize('workers', [1, 3])
+    @pytest.mark.parametrize('offset, size', [(0, 10), (5000, 3000),
+                                              (10000, 10 ** 6),
+                                              (10 ** 6, 10)])
+    def test__read(self, workers, offset, size):
+        system.zip_file('test.log', workers=workers, block_size=1000)
+        index = system.GzipIndex('test.log.gz', spacing=2000)
+        assert index.size == len(self.text)
+        assert index.read(offset, size) == self.text[offset:offset + size]
+
+    def test__checkpoints(self):
+        system.zip_file('test.log', workers=2, block_size=1000)
+        index = system.GzipIndex('test.log.gz', spacing=2000)
+        assert index.uncompressed_offsets[0] == 0
+        assert np.all(np.diff(index.uncompressed_offsets) >= 2000)
+        assert index.compressed_offsets.size > 5
+
+    def test__saved_index(self):
+        system.zip_file('test.log', workers=2, block_size=1000)
+        first = system.GzipIndex('test.log.gz', spacing=2000)
+        assert osp.isfile('test.log.gz.gzi.npz')
+        second = system.GzipIndex('test.log.gz', spacing=2000)
+        assert np.all(first.compressed_offsets == second.compressed_offsets)
+        assert second.size == len(self.text)
+
+
 # Test flatten
 flatten = {'lists ints floats': ([[1, 2, 3], [4, 5, 6], [7., 8., 9.]],
                                  [1, 2, 3, 4, 5, 6, 7, 8, 9]),
@@ -131,6 +446,215 @@ def test__logger_setup(tmpdir, kwargs, expected):
         assert osp.isfile('test.log')
 
 
+# Test logger_setup queue mode
+@pytest.mark.parametrize('queue_full', ['drop', 'block'])
+def test__logger_setup_queue(tmpdir, queue_full):
+    tmpdir.chdir()
+    logger = system.logger_setup(name='test_queue_{}'.format(queue_full),
+                                 log_file='test.log', console_level=100,
+                                 queue_size=1000, queue_full=queue_full)
+    handler = logger.handlers[0]
+    assert isinstance(handler, logging.handlers.QueueHandler)
+    for idx in range(50):
+        logger.warning('record %d', idx)
+    handler.listener.stop()
+    handler.listener.stop()
+    with open('test.log', 'r') as f:
+        text = f.read()
+    assert text.count('record') == 50
+    assert handler.dropped == 0
+    logger.removeHandler(handler)
+
+
+def test__logger_setup_queue_drop():
+    handler = system._BoundedQueueHandler(queue.Queue(maxsize=2), block=False)
+    logger = logging.getLogger('test_queue_drop')
+    logger.addHandler(handler)
+    for idx in range(5):
+        logger.warning('record %d', idx)
+    logger.removeHandler(handler)
+    assert handler.dropped == 3
+    assert handler.queue.get_nowait().getMessage() == 'record 0'
+
+
+def test__logger_setup_queue_full():
+    with pytest.raises(ValueError):
+        system.logger_setup(name='test_queue_bad', queue_full='wait')
+
+
+def test__logger_setup_rotation_both():
+    with pytest.raises(ValueError):
+        system.logger_setup(name='test_rotation_both', max_bytes=300,
+                            when='midnight')
+
+
+# Test logger_setup rotation
+def test__logger_setup_rotation(tmpdir):
+    tmpdir.chdir()
+    logger = system.logger_setup(name='test_rotation', log_file='test.log',
+                                 console_level=100, max_bytes=300,
+                                 backup_count=2)
+    for idx in range(40):
+        logger.warning('record %d', idx)
+    file_handler = logger.handlers[1]
+    file_handler.close()
+    logger.removeHandler(file_handler)
+    assert sorted(os.listdir('.')) == ['test.log', 'test.log.1.gz',
+                                       'test.log.2.gz']
+    with gzip.open('test.log.1.gz', 'rt') as f:
+        assert 'record' in f.read()
+
+
+def test__logger_setup_rotation_keep_all(tmpdir):
+    tmpdir.chdir()
+    logger = system.logger_setup(name='test_rotation_all',
+                                 log_file='test.log', console_level=100,
+                                 max_bytes=200)
+    for idx in range(40):
+        logger.warning('record %d', idx)
+    file_handler = logger.handlers[1]
+    file_handler.close()
+    logger.removeHandler(file_handler)
+    backups = sorted(x for x in os.listdir('.') if x.endswith('.gz'))
+    assert len(backups) > 3
+    assert osp.getsize('test.log') < 200
+    newest = 'test.log.1.gz'
+    oldest = 'test.log.{}.gz'.format(len(backups))
+    with gzip.open(newest, 'rt') as f:
+        newest_text = f.read()
+    with gzip.open(oldest, 'rt') as f:
+        assert 'record 0\n' in f.read()
+    assert 'record 0\n' not in newest_text
+
+
+# Test logger_setup sampling, rate limiting and JSON lines
+class Unformattable:
+
+    def __str__(self):
+        raise AssertionError('dropped record was formatted')
+
+
+def test__logger_setup_sample(tmpdir):
+    tmpdir.chdir()
+    logger = system.logger_setup(name='test_sample', log_file='test.jsonl',
+                                 console_level=100, file_level=logging.DEBUG,
+                                 json_lines=True, sample=3)
+    for idx in range(9):
+        logger.debug('%s', idx if idx % 3 == 0 else Unformattable())
+    logger.error('error')
+    logger.handlers[1].flush()
+    with open('test.jsonl', 'r') as f:
+        entries = [json.loads(x) for x in f]
+    assert [x['message'] for x in entries] == ['0', '3', '6', 'error']
+    assert entries[-1]['level'] == 'ERROR'
+    assert entries[-1]['name'] == 'test_sample'
+    assert logger.filters[0].sampled_out == 6
+
+
+def test__record_limiter_rate():
+    limiter = system._RecordLimiter(rate=2, burst=3)
+    record = logging.makeLogRecord({'levelno': logging.DEBUG})
+    assert [limiter.filter(record) for _ in range(5)] == [True] * 3 + \
+        [False] * 2
+    assert limiter.rate_limited == 2
+    limiter._stamp -= 1
+    assert [limiter.filter(record) for _ in range(3)] == [True, True, False]
+    warning = logging.makeLogRecord({'levelno': logging.WARNING})
+    assert limiter.filter(warning)
+
+
+# Test LineIndex
+class TestLineIndex:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        self.lines = ['line {}\n'.format(x) for x in range(10)]
+        with open('test.txt', 'w') as f:
+            f.write(''.join(self.lines))
+
+    def test__len(self):
+        with system.LineIndex('test.txt') as idx:
+            assert len(idx) == 10
+
+    @pytest.mark.parametrize('item', [0, 5, -1, slice(2, 5),
+                                      slice(None, None, 3), slice(8, 20)])
+    def test__getitem(self, item):
+        with system.LineIndex('test.txt') as idx:
+            assert idx[item] == self.lines[item]
+
+    def test__index_error(self):
+        with system.LineIndex('test.txt') as idx:
+            with pytest.raises(IndexError):
+                idx[10]
+
+    def test__no_trailing_newline(self):
+        with open('test.txt', 'a') as f:
+            f.write('last')
+        with system.LineIndex('test.txt') as idx:
+            assert len(idx) == 11
+            assert idx[-1] == 'last'
+
+    def test__empty_file(self):
+        open('test.txt', 'w').close()
+        with system.LineIndex('test.txt') as idx:
+            assert len(idx) == 0
+            assert idx[:] == []
+
+    def test__saved_index(self):
+        system.LineIndex('test.txt').close()
+        assert osp.isfile('test.txt.idx.npz')
+        with open('test.txt', 'a') as f:
+            f.write('line 10\n')
+        with system.LineIndex('test.txt') as idx:
+            assert idx[-1] == 'line 10\n'
+
+    def test__sample(self):
+        with system.LineIndex('test.txt') as idx:
+            sample = idx.sample(4, seed=0)
+        assert len(sample) == 4
+        assert sample == [x for x in self.lines if x in sample]
+
+
+# Test load_batch
+class TestLoadBatch:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        os.makedirs('extra')
+        self.paths = [osp.join(os.getcwd(), 'extra', 'run_1.txt'),
+                      osp.join(os.getcwd(), 'run_2.txt'),
+                      osp.join(os.getcwd(), 'run_3.txt')]
+        for idx, path in enumerate(self.paths):
+            with open(path, 'w') as f:
+                f.write('a b\n')
+                f.write(''.join('{} {}\n'.format(idx, x)
+                                for x in range(idx + 1)))
+
+    @pytest.mark.parametrize('processes', [False, True])
+    def test__paths(self, processes):
+        output = system.load_batch(self.paths, processes=processes,
+                                   header_row=0, skip_rows=1)
+        assert output.dtype.names == ('a', 'b')
+        assert np.all(output['a'] == np.array([0, 1, 1, 2, 2, 2]))
+        assert np.all(output['b'] == np.array([0, 0, 1, 0, 1, 2]))
+
+    def test__search(self):
+        output = system.load_batch('run_', source_field='source',
+                                   header_row=0, skip_rows=1)
+        assert np.all(output['source'] == np.array([0, 1, 1, 2, 2, 2]))
+
+    def test__promote_formats(self):
+        output = system.load_batch(self.paths, header_row=0, skip_rows=1,
+                                   formats='infer')
+        assert output.dtype['a'] == np.int8
+
+    def test__no_files(self):
+        with pytest.raises(ValueError):
+            system.load_batch([])
+
+
 # Test load_file
 load_file = {'lines': ({'path': 'test.txt'},
                        ['line one\n', 'line two\n', 'line three\n']),
@@ -206,6 +730,366 @@ def test__load_records(kwargs, a_key, a_expect, d_key, d_expect):
     assert np.all(output[d_key] == d_expect)
 
 
+# Test stream_records
+stream_records = {'one chunk': (10, {}, [2]),
+                  'row chunks': (1, {}, [1, 1]),
+                  'some cols': (1, {'cols': (0, 3)}, [1, 1]),
+                  }
+
+
+@pytest.mark.usefixtures('fixture_get_header')
+@pytest.mark.parametrize('chunk_rows, kwargs, expected',
+                         list(stream_records.values()),
+                         ids=list(stream_records.keys()))
+def test__stream_records(chunk_rows, kwargs, expected):
+    kwargs = dict(kwargs, path='test.txt', header_row=0, skip_rows=2)
+    chunks = list(system.stream_records(chunk_rows=chunk_rows, **kwargs))
+    assert [x.size for x in chunks] == expected
+    output = np.concatenate(chunks)
+    assert np.all(output == system.load_records(**kwargs))
+
+
+@pytest.mark.usefixtures('fixture_get_header')
+def test__stream_records_bad_chunk():
+    with pytest.raises(ValueError):
+        next(system.stream_records('test.txt', chunk_rows=0))
+
+
+# Test load_records cache
+class TestLoadRecordsCache:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        with open('test.txt', 'w') as f:
+            f.write(''.join(lines))
+        self.kwargs = {'path': 'test.txt', 'header_row': 0, 'skip_rows': 2,
+                       'cache_dir': 'cache'}
+
+    def cache_files(self):
+        return sorted(os.listdir(self.kwargs['cache_dir']))
+
+    def test__cache_hit(self):
+        first = system.load_records(**self.kwargs)
+        files = self.cache_files()
+        second = system.load_records(**self.kwargs)
+        assert len(files) == 1
+        assert self.cache_files() == files
+        assert isinstance(second, np.memmap)
+        assert np.all(first == second)
+
+    def test__cache_arguments(self):
+        system.load_records(**self.kwargs)
+        system.load_records(cols=(0, 3), **self.kwargs)
+        assert len(self.cache_files()) == 2
+
+    def test__cache_modified_file(self):
+        system.load_records(**self.kwargs)
+        with open('test.txt', 'a') as f:
+            f.write('9\t10\t11\t12\n')
+        output = system.load_records(**self.kwargs)
+        assert np.all(output['a'] == np.array([1.0, 5.0, 9.0]))
+        assert len(self.cache_files()) == 2
+
+    def test__cache_eviction(self):
+        system.load_records(**self.kwargs)
+        oldest = self.cache_files()
+        os.utime(osp.join('cache', oldest[0]), (0, 0))
+        size = osp.getsize(osp.join('cache', oldest[0]))
+        system.load_records(cols=(0, 3), cache_max_bytes=size,
+                            **self.kwargs)
+        remaining = self.cache_files()
+        assert len(remaining) == 1
+        assert remaining != oldest
+
+
+# Test load_records workers
+@pytest.mark.parametrize('workers', [2, 3, 8])
+def test__load_records_workers(tmpdir, workers):
+    tmpdir.chdir()
+    data = np.arange(300).reshape(100, 3)
+    with open('test.txt', 'w') as f:
+        f.write('x y z\n\n')
+        f.write(''.join('{} {} {}\n'.format(*row) for row in data))
+    kwargs = {'path': 'test.txt', 'header_row': 0, 'skip_rows': 2,
+              'formats': ('i4', 'f8', 'i4')}
+    serial = system.load_records(**kwargs)
+    parallel = system.load_records(workers=workers, **kwargs)
+    assert parallel.dtype == serial.dtype
+    assert np.all(parallel == serial)
+
+
+# Test load_records formats='infer'
+infer_format = {'int8': (['1', '-5', '127'], 'i1'),
+                'int16': (['1', '-129'], 'i2'),
+                'int32': (['40000', '2'], 'i4'),
+                'int64': (['3000000000'], 'i8'),
+                'float32': (['0.5', '1.25', '-3'], 'f4'),
+                'float64': (['0.123456789', '1'], 'f8'),
+                'bytes': (['run_1', 'run_10'], 'S6'),
+                'empty': ([], 'f8'),
+                }
+
+
+@pytest.mark.parametrize('tokens, expected',
+                         list(infer_format.values()),
+                         ids=list(infer_format.keys()))
+def test___infer_format(tokens, expected):
+    assert system._infer_format(tokens) == expected
+
+
+@pytest.mark.usefixtures('fixture_get_header')
+def test__load_records_infer():
+    output = system.load_records('test.txt', header_row=0, skip_rows=2,
+                                 formats='infer')
+    assert output.dtype.names == ('a', 'b', 'c', 'd')
+    assert all(output.dtype[x] == np.int8 for x in range(4))
+    assert np.all(output['d'] == np.array([4, 8]))
+
+
+# Test compressed input
+@pytest.fixture(params=[bz2, gzip, lzma], ids=['bz2', 'gzip', 'lzma'])
+def compressed_setup(request, tmpdir):
+    tmpdir.chdir()
+    file_name = 'test.txt.z'
+    with request.param.open(file_name, 'wt') as f:
+        f.write(''.join(lines))
+    return file_name
+
+
+def test__compressed_load_file(compressed_setup):
+    assert system.load_file(compressed_setup) == lines
+
+
+def test__compressed_get_header(compressed_setup):
+    assert system.get_header(compressed_setup) == ['a', 'b', 'c', 'd']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test__compressed_load_records(compressed_setup, workers):
+    output = system.load_records(compressed_setup, header_row=0, skip_rows=2,
+                                 workers=workers)
+    assert np.all(output['a'] == np.array([1.0, 5.0]))
+    assert np.all(output['d'] == np.array([4.0, 8.0]))
+
+
+def test__compressed_stream_records(compressed_setup):
+    chunks = list(system.stream_records(compressed_setup, chunk_rows=1,
+                                        header_row=0, skip_rows=2))
+    assert [x['b'] for x in chunks] == [2.0, 6.0]
+
+
+@pytest.mark.parametrize('text', ['BZhalf x\n1 2\n', 'BZh9 x\n1 2\n',
+                                  '\x1fx y\n1 2\n'])
+def test__compressed_magic_plain_text(tmpdir, text):
+    tmpdir.chdir()
+    with open('plain.txt', 'w') as f:
+        f.write(text)
+    assert system._compression('plain.txt') is None
+    assert system.load_file('plain.txt') == text.splitlines(keepends=True)
+
+
+# Test load_records engine='numpy'
+engine = {'blank line': ('x y z\n1 2.5 a\n\n-3 1e3 bb\n',
+                       {'skip_rows': 1, 'cols': (0, 1)}),
+          'header': ('x y z\n1 2.5 3\n-3 1e3 4\n',
+                     {'skip_rows': 1, 'header_row': 0}),
+          'formats': ('1 2.5 a\n-3 1e3 bb\n',
+                      {'formats': ('i4', 'f8', 'S2')}),
+          'negative cols': ('1\t2\t3\n4\t5\t6',
+                            {'cols': (-1, 0)}),
+          'comments': ('# note\n1 2 # 3\n  4 5\r\n#\n',
+                       {'cols': (0, 1)}),
+          'one row': ('1 2 3\n', {}),
+          'bool': ('0 1\n2 0\n-1 0\n', {'formats': ('?', '?')}),
+          'unicode': ('\u00e9t\u00e9 1\nna\u00efve 2\n',
+                      {'formats': ('U5', 'i8')}),
+          }
+
+
+@pytest.mark.parametrize('text, kwargs',
+                         list(engine.values()),
+                         ids=list(engine.keys()))
+def test__load_records_engine(tmpdir, text, kwargs):
+    tmpdir.chdir()
+    with open('test.txt', 'w') as f:
+        f.write(text)
+    expected = system.load_records('test.txt', **kwargs)
+    actual = system.load_records('test.txt', engine='numpy', **kwargs)
+    assert actual.dtype == expected.dtype
+    assert actual.shape == expected.shape
+    assert np.all(actual == expected)
+
+
+def test___tokenize_stream_blocks():
+    dtype = {'names': ['a', 'b'], 'formats': ['i4', 'i4']}
+    stream = io.BytesIO(b'1 2\n33 4\n5 6')
+    pieces = system._tokenize_stream(stream, [0, 1], dtype, block_size=3)
+    output = np.concatenate(pieces)
+    assert np.all(output['a'] == np.array([1, 33, 5]))
+    assert np.all(output['b'] == np.array([2, 4, 6]))
+
+
+
+def test___tokenize_stream_size():
+    dtype = {'names': ['a', 'b'], 'formats': ['i4', 'i4']}
+    stream = io.BytesIO(b'1 2\n33 4\n5 6\n')
+    stream.seek(4)
+    pieces = system._tokenize_stream(stream, [0, 1], dtype, block_size=3,
+                                     size=5)
+    output = np.concatenate(pieces)
+    assert np.all(output['a'] == np.array([33]))
+    assert np.all(output['b'] == np.array([4]))
+
+
+def test___load_range_blocks(tmpdir):
+    tmpdir.chdir()
+    with open('test.txt', 'w') as f:
+        f.write('0 0\n1 2\n33 4\n5 6\n7 8\n')
+    dtype = {'names': ['a', 'b'], 'formats': ['i4', 'i4']}
+    output = system._load_range('test.txt', 4, 17, [0, 1], dtype,
+                                engine='numpy', block_size=4)
+    assert np.all(output['a'] == np.array([1, 33, 5]))
+    assert np.all(output['b'] == np.array([2, 4, 6]))
+
+def test__load_records_engine_columns_changed(tmpdir):
+    tmpdir.chdir()
+    with open('test.txt', 'w') as f:
+        f.write('1 2\n3\n')
+    with pytest.raises(ValueError):
+        system.load_records('test.txt', cols=(0, 1), engine='numpy')
+
+
+def test__load_records_engine_format(tmpdir):
+    tmpdir.chdir()
+    with open('test.txt', 'w') as f:
+        f.write('1 2\n')
+    with pytest.raises(ValueError):
+        system.load_records('test.txt', formats=('c16', ), engine='numpy')
+
+
+def test__load_records_engine_unknown(tmpdir):
+    tmpdir.chdir()
+    with open('test.txt', 'w') as f:
+        f.write('1 2\n')
+    with pytest.raises(ValueError):
+        system.load_records('test.txt', engine='unknown')
+
+
+# Test save_records and open_records
+class TestRecordStore:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        self.records = np.array([(1, 2.5, b'a'), (2, np.nan, b'b'),
+                                 (3, -1.0, b'c')],
+                                dtype=[('x', 'i4'), ('y', 'f8'), ('z', 'S1')])
+
+    @pytest.mark.parametrize('compress', [False, True])
+    def test__round_trip(self, compress):
+        system.save_records('test.rec', self.records, compress=compress)
+        output = system.open_records('test.rec')
+        assert output.dtype == self.records.dtype
+        assert np.all(output['x'] == self.records['x'])
+        assert np.array_equal(output['y'], self.records['y'], equal_nan=True)
+        assert np.all(output['z'] == self.records['z'])
+
+    def test__projection(self, monkeypatch):
+        system.save_records('test.rec', self.records)
+        loaded = []
+        original = system._load_column
+
+        def load_column(path, field, compressed):
+            loaded.append(field['name'])
+            return original(path, field, compressed)
+
+        monkeypatch.setattr(system, '_load_column', load_column)
+        output = system.open_records('test.rec', cols=('z', 'x'))
+        assert output.dtype.names == ('z', 'x')
+        assert loaded == ['z', 'x']
+
+    def test__statistics(self):
+        system.save_records('test.rec', self.records)
+        with open(osp.join('test.rec', 'records.json'), 'r') as f:
+            fields = {x['name']: x for x in json.load(f)['fields']}
+        assert (fields['x']['min'], fields['x']['max']) == (1, 3)
+        assert (fields['y']['min'], fields['y']['max']) == (-1.0, 2.5)
+        assert fields['z']['min'] is None
+
+    @pytest.mark.parametrize('where, expected',
+                             [({'x': (2, None)}, [2, 3]),
+                              ({'x': (None, 1), 'y': (0, 3)}, [1]),
+                              ({'y': (-5, 0)}, [3])])
+    def test__where(self, where, expected):
+        system.save_records('test.rec', self.records)
+        output = system.open_records('test.rec', cols='x', where=where)
+        assert output['x'].tolist() == expected
+
+    def test__where_skips_file(self, monkeypatch):
+        system.save_records('test.rec', self.records)
+        monkeypatch.setattr(system, '_load_column', None)
+        output = system.open_records('test.rec', where={'x': (10, 20)})
+        assert output.size == 0
+        assert output.dtype == self.records.dtype
+
+    def test__missing_field(self):
+        system.save_records('test.rec', self.records)
+        with pytest.raises(KeyError):
+            system.open_records('test.rec', cols=('w', ))
+
+
+# Test load_records filters
+class TestRecordFilters:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        with open('test.txt', 'w') as f:
+            f.write('x y\n')
+            f.write(''.join('{} {}\n'.format(x, x % 3) for x in range(10)))
+        self.kwargs = {'path': 'test.txt', 'header_row': 0, 'skip_rows': 1}
+
+    @pytest.mark.parametrize('filters, expected',
+                             [({'where': {'x': (3, 6)}}, [3, 4, 5, 6]),
+                              ({'where': {'x': (None, 2), 'y': (1, None)}},
+                               [1, 2]),
+                              ({'predicate': lambda r: r['y'] == 0},
+                               [0, 3, 6, 9]),
+                              ({'where': {'x': (20, None)}}, [])])
+    @pytest.mark.parametrize('cache_dir', [None, 'cache'])
+    def test__load_records(self, filters, expected, cache_dir):
+        for _ in range(2):
+            output = system.load_records(chunk_rows=3, cache_dir=cache_dir,
+                                         **dict(self.kwargs, **filters))
+            assert output['x'].tolist() == expected
+
+    @pytest.mark.parametrize('engine', ['loadtxt', 'numpy'])
+    @pytest.mark.parametrize('workers', [1, 3])
+    def test__load_records_workers(self, engine, workers):
+        with open('test.txt', 'a') as f:
+            f.write('# comment\n\n')
+            f.write(''.join('{} {}\n'.format(x, x % 3)
+                            for x in range(10, 40)))
+        output = system.load_records(chunk_rows=4, workers=workers,
+                                     engine=engine, where={'y': (0, 0)},
+                                     **self.kwargs)
+        assert output['x'].tolist() == list(range(0, 40, 3))
+
+    def test__gather_records(self):
+        dtype = {'names': ['x'], 'formats': ['i8']}
+        pieces = (np.arange(x, x + 3).astype(dtype) for x in range(0, 30, 3))
+        assert system._gather_records(pieces, dtype)['x'].tolist() == \
+            list(range(30))
+        assert system._gather_records([], dtype).size == 0
+
+    def test__stream_records(self):
+        chunks = list(system.stream_records(chunk_rows=4,
+                                            where={'x': (3, 8)},
+                                            **self.kwargs))
+        assert [x['x'].tolist() for x in chunks] == [[3], [4, 5, 6, 7], [8]]
+
+
 # Test preserve_cwd
 @pytest.fixture()
 def preserve_cwd_setup(request):
@@ -235,6 +1119,140 @@ def test__preserve_cwd(preserve_cwd_setup):
     assert os.getcwd() == preserve_cwd_setup['original_dir']
 
 
+# Test search_files
+class TestSearchFiles:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        self.text = b''.join(b'step %d ok\n' % x for x in range(5000))
+        self.text += b'step 5000 FAILED\nstep 5001 FAILED\n'
+        for name in ('run_1.log', 'run_2.log'):
+            with open(name, 'wb') as f:
+                f.write(self.text if name == 'run_1.log' else b'clean\n')
+        with open('run_3.log', 'wb') as f:
+            pass
+        with gzip.open('run_4.log.gz', 'wb') as f:
+            f.write(self.text)
+        self.offset = self.text.index(b'FAILED')
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test__literal(self, workers):
+        found = system.search_files('run_', 'FAILED', workers=workers)
+        assert found == [
+            system.Match(osp.join(os.getcwd(), 'run_1.log'), 5001,
+                         self.offset),
+            system.Match(osp.join(os.getcwd(), 'run_4.log.gz'), 5001,
+                         self.offset),
+            ]
+
+    def test__regex(self):
+        found = system.search_files(['run_1.log', 'run_2.log'],
+                                    r'^step \d+ fail', regex=True,
+                                    ignore_case=True, workers=1)
+        assert found == [system.Match('run_1.log', 5001,
+                                      self.text.index(b'step 5000'))]
+
+    def test__stream_blocks(self):
+        found = system._search_stream('x', io.BytesIO(self.text),
+                                      re.compile(b'FAILED'), block_size=100)
+        assert found == system.Match('x', 5001, self.offset)
+        assert system._search_stream('x', io.BytesIO(b'abc'),
+                                     re.compile(b'c'), block_size=1) == \
+            system.Match('x', 1, 2)
+
+    @pytest.mark.parametrize('block_size', [1, 7, 1000, 2 ** 24])
+    def test__line_count_blocks(self, block_size):
+        found = system._search_file('run_1.log', re.escape(b'FAILED'), 0,
+                                    decompress=True, block_size=block_size)
+        assert found == system.Match('run_1.log', 5001, self.offset)
+
+    def test__no_decompress(self):
+        assert system.search_files(['run_4.log.gz'], 'FAILED', workers=1,
+                                   decompress=False) == []
+
+
+# Test memory_status
+def test__memory_status():
+    system.CALL_REGISTRY.clear()
+
+    @system.memory_status(top=2)
+    def inner():
+        return sum(bytearray(2 * 10 ** 6))
+
+    @system.memory_status(top=2)
+    def outer():
+        inner()
+        return bytearray(10 ** 5)
+
+    tracing = tracemalloc.is_tracing()
+    kept = outer()
+    assert tracemalloc.is_tracing() == tracing
+    stats = system.CALL_REGISTRY.stats()
+    prefix = '{}.test__memory_status.<locals>.'.format(__name__)
+    inner_stats = stats[prefix + 'inner']['memory']
+    outer_stats = stats[prefix + 'outer']['memory']
+    assert inner_stats['peak_max_bytes'] >= 2 * 10 ** 6
+    assert inner_stats['net_max_bytes'] < 10 ** 5
+    assert outer_stats['peak_max_bytes'] >= 2 * 10 ** 6
+    assert outer_stats['net_max_bytes'] >= len(kept)
+    assert outer_stats['top_sites'][0][0].startswith(__file__)
+    system.CALL_REGISTRY.clear()
+
+
+def test__memory_status_threads():
+    system.CALL_REGISTRY.clear()
+    barrier = threading.Barrier(2)
+
+    @system.memory_status(top=1)
+    def work(idx):
+        data = bytearray(10 ** 5)
+        barrier.wait(timeout=5)
+        if idx:
+            time.sleep(0.05)
+        return len(data)
+
+    tracing = tracemalloc.is_tracing()
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(work, range(2))) == [10 ** 5] * 2
+    assert tracemalloc.is_tracing() == tracing
+    name = '{}.test__memory_status_threads.<locals>.work'.format(__name__)
+    assert system.CALL_REGISTRY.stats()[name]['memory']['count'] == 2
+    system.CALL_REGISTRY.clear()
+
+
+def test__memory_status_threads_peak():
+    system.CALL_REGISTRY.clear()
+    freed = threading.Event()
+    returned = threading.Event()
+
+    @system.memory_status(top=0)
+    def large():
+        data = bytearray(5 * 10 ** 7)
+        del data
+        freed.set()
+        returned.wait(timeout=5)
+
+    @system.memory_status(top=0)
+    def small():
+        return bytearray(100)
+
+    def other():
+        freed.wait(timeout=5)
+        small()
+        returned.set()
+
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        jobs = [executor.submit(large), executor.submit(other)]
+        for job in jobs:
+            job.result()
+    stats = system.CALL_REGISTRY.stats()
+    name = '{}.test__memory_status_threads_peak.<locals>.large'.format(
+        __name__)
+    assert stats[name]['memory']['peak_max_bytes'] >= 5 * 10 ** 7
+    system.CALL_REGISTRY.clear()
+
+
 # Test status
 def test__status(capsys):
 
@@ -248,6 +1266,26 @@ def test__status(capsys):
                                 'Completed:', 'print_num', '(runtime:']
 
 
+@pytest.mark.parametrize('enabled, calls', [(True, 2), (None, 1),
+                                            (False, 0)])
+def test__status_timing(capsys, enabled, calls):
+    system.CALL_REGISTRY.clear()
+
+    @system.status(timing=True, verbose=False, enabled=enabled)
+    def add(x, y):
+        return x + y
+
+    assert add(1, 2) == 3
+    system.CALL_REGISTRY.enabled = False
+    assert add(2, 3) == 5
+    system.CALL_REGISTRY.enabled = True
+    stats = system.CALL_REGISTRY.stats()
+    name = '{}.test__status_timing.<locals>.add'.format(__name__)
+    assert stats.get(name, {}).get('timing', {}).get('count', 0) == calls
+    assert capsys.readouterr()[0] == ''
+    system.CALL_REGISTRY.clear()
+
+
 # Test unzip
 @pytest.fixture(scope='function')
 def unzip_setup(request):
@@ -315,6 +1353,51 @@ class TestWalkDir:
                 [osp.join(self.main_dir, self.extra_dir, 'extra.png'),
                  osp.join(self.main_dir, 'main.png')])
 
+    @pytest.mark.parametrize('kwargs, expected',
+                             [({'suffix': '.png'}, ['extra.png', 'main.png']),
+                              ({'suffix': ('.inp', '.jpeg')},
+                               ['extra.inp', 'main.jpeg']),
+                              ({'pattern': 'e*.p?g'}, ['extra.png']),
+                              ({'regex': r'^main\.(png|jpeg)$'},
+                               ['main.jpeg', 'main.png']),
+                              ({'exclude': 'ext*'}, ['main.jpeg', 'main.png']),
+                              ({'min_size': 29}, ['extra.inp', 'extra.png',
+                                                  'main.jpeg']),
+                              ({'max_size': 28}, ['main.png']),
+                              ({'search': 'main', 'workers': 3},
+                               ['main.jpeg', 'main.png'])])
+    def test__scan_dir_filters(self, kwargs, expected):
+        found = system.scan_dir(path=self.main_dir, **kwargs)
+        assert sorted(osp.basename(x) for x in found) == expected
+
+    def test__scan_dir_mtime(self):
+        path = osp.join(self.main_dir, 'main.png')
+        os.utime(path, (0, 0))
+        assert list(system.scan_dir(older=1)) == [path]
+        assert path not in system.walk_dir(newer=1)
+
+    def test__scan_dir_lazy(self):
+        found = system.scan_dir(workers=2)
+        assert next(found).startswith(self.main_dir)
+
+    @pytest.mark.parametrize('workers', [1, 4])
+    def test__walk_dir_workers(self, workers):
+        assert (system.walk_dir('.png', workers=workers) ==
+                [osp.join(self.main_dir, self.extra_dir, 'extra.png'),
+                 osp.join(self.main_dir, 'main.png')])
+
+    @pytest.mark.parametrize('workers', [1, 4])
+    def test__walk_dir_symlinks(self, workers):
+        os.symlink(self.extra_dir, osp.join(self.main_dir, 'extra_link'))
+        os.symlink(osp.join(self.main_dir, 'main.png'),
+                   osp.join(self.main_dir, 'png_link'))
+        assert (system.walk_dir('', workers=workers) ==
+                [osp.join(self.extra_dir, 'extra.inp'),
+                 osp.join(self.extra_dir, 'extra.png'),
+                 osp.join(self.main_dir, 'main.jpeg'),
+                 osp.join(self.main_dir, 'main.png'),
+                 osp.join(self.main_dir, 'png_link')])
+
 
 # Test zip_file
 @pytest.fixture(scope='function')
@@ -333,3 +1416,173 @@ def test__zip_file(zip_setup):
     with open(zip_setup, 'r') as f:
         text = f.read()
     assert 'Test file' == text
+
+
+zip_file = {'serial': ({}, b'Test file' * 1000),
+            'level': ({'level': 1}, b'Test file' * 1000),
+            'parallel': ({'workers': 3, 'block_size': 100},
+                         b'Test file' * 1000),
+            'parallel empty': ({'workers': 2}, b''),
+            }
+
+
+@pytest.mark.parametrize('kwargs, text',
+                         list(zip_file.values()),
+                         ids=list(zip_file.keys()))
+def test__zip_file_options(tmpdir, kwargs, text):
+    tmpdir.chdir()
+    with open('junk.txt', 'wb') as f:
+        f.write(text)
+    system.zip_file('junk.txt', **kwargs)
+    assert not osp.isfile('junk.txt')
+    assert subprocess.call(['gzip', '-t', 'junk.txt.gz']) == 0
+    system.unzip_file('junk.txt.gz')
+    with open('junk.txt', 'rb') as f:
+        assert f.read() == text
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test__zip_file_synced(tmpdir, monkeypatch, workers):
+    tmpdir.chdir()
+    with open('test.txt', 'w') as f:
+        f.write('Test file')
+    calls = []
+    fsync = os.fsync
+    replace = os.replace
+    remove = os.remove
+    monkeypatch.setattr(os, 'fsync',
+                        lambda fd: calls.append('fsync') or fsync(fd))
+    monkeypatch.setattr(os, 'replace',
+                        lambda *x: calls.append('replace') or replace(*x))
+    monkeypatch.setattr(os, 'remove',
+                        lambda x: calls.append('remove') or remove(x))
+    system.zip_file('test.txt', workers=workers)
+    assert calls == ['fsync', 'replace', 'fsync', 'remove']
+    del calls[:]
+    system.unzip_file('test.txt.gz')
+    assert calls == ['fsync', 'replace', 'fsync', 'remove']
+
+
+# Test zip_dir and unzip_dir
+class TestZipDir:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmpdir):
+        tmpdir.chdir()
+        os.makedirs(osp.join('data', 'extra'))
+        self.files = {osp.join('data', 'a.log'): b'a' * 1000,
+                      osp.join('data', 'extra', 'b.log'): b'b' * 1000,
+                      osp.join('data', 'c.txt'): b'c' * 1000}
+        for path, text in self.files.items():
+            with open(path, 'wb') as f:
+                f.write(text)
+
+    def test__round_trip(self):
+        summary = system.zip_dir('data', workers=2)
+        assert [x.path for x in summary] == sorted(self.files)
+        assert not any(x.skipped for x in summary)
+        assert all(x.bytes_in == 1000 and 0 < x.bytes_out < 1000
+                   for x in summary)
+        assert all(osp.isfile('{}.gz'.format(x)) for x in self.files)
+
+        summary = system.unzip_dir('data', workers=2)
+        assert not any(x.skipped for x in summary)
+        for path, text in self.files.items():
+            with open(path, 'rb') as f:
+                assert f.read() == text
+
+    def test__search(self):
+        summary = system.zip_dir('data', search='.log')
+        assert len(summary) == 2
+        assert osp.isfile(osp.join('data', 'c.txt'))
+
+    def test__skip_compressed(self):
+        system.zip_dir('data', search='c.txt')
+        summary = system.zip_dir('data')
+        skipped = {x.path: x.skipped for x in summary}
+        assert skipped[osp.join('data', 'c.txt.gz')]
+        assert not skipped[osp.join('data', 'a.log')]
+
+    def test__skip_up_to_date(self):
+        path = osp.join('data', 'a.log')
+        with gzip.open('{}.gz'.format(path), 'wb') as f:
+            f.write(b'old')
+        os.utime('{}.gz'.format(path), (0, 0))
+        summary = system.unzip_dir('data', search='.gz')
+        assert [x.skipped for x in summary] == [True]
+
+    def test__interrupted(self, monkeypatch):
+        def fail(*args):
+            raise OSError('disk full')
+
+        monkeypatch.setattr(system.shutil, 'copyfileobj', fail)
+        path = osp.join('data', 'a.log')
+        with pytest.raises(OSError):
+            system.zip_file(path)
+        assert osp.isfile(path)
+        assert sorted(os.listdir('data')) == ['a.log', 'c.txt', 'extra']
+
+
+# Test unzip_file suffix
+def test__unzip_file_suffix(tmpdir):
+    tmpdir.chdir()
+    with gzip.open('data.log.gz', 'wb') as f:
+        f.write(b'text')
+    system.unzip_file('data.log.gz')
+    assert os.listdir('.') == ['data.log']
+
+
+# Test zip_file codecs
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('codec', list(system.CODECS))
+def test__zip_file_codec(tmpdir, codec, workers):
+    tmpdir.chdir()
+    text = b'Test file\n' * 1000
+    with open('junk.txt', 'wb') as f:
+        f.write(text)
+    target = system.zip_file('junk.txt', codec=codec, workers=workers,
+                             block_size=1000)
+    assert target == 'junk.txt{}'.format(system.CODECS[codec].extension)
+    assert system._compression(target) == codec
+    assert system.load_file(target, all_lines=False) == text.decode()
+    assert system.unzip_file(target) == 'junk.txt'
+    with open('junk.txt', 'rb') as f:
+        assert f.read() == text
+
+
+zip_file_auto = {'best ratio': (None, 'lzma'),
+                 'fast': (1e9, 'gzip'),
+                 }
+
+
+@pytest.mark.parametrize('min_mb_per_s, expected',
+                         list(zip_file_auto.values()),
+                         ids=list(zip_file_auto.keys()))
+def test__zip_file_auto(tmpdir, monkeypatch, min_mb_per_s, expected):
+    tmpdir.chdir()
+    codecs = collections.OrderedDict(
+        (name, system.CODECS[name]) for name in ('gzip', 'bz2', 'lzma'))
+    monkeypatch.setattr(system, 'CODECS', codecs)
+    monkeypatch.setattr(system.time, 'perf_counter',
+                        iter(range(100)).__next__)
+    with open('junk.txt', 'wb') as f:
+        f.write(bytes(range(256)) * 100 + b'x' * 10 ** 5)
+    assert system._select_codec('junk.txt',
+                                min_mb_per_s=min_mb_per_s) == expected
+
+
+def test__zip_file_unknown_codec(tmpdir):
+    tmpdir.chdir()
+    with open('junk.txt', 'w') as f:
+        f.write('Test file')
+    with pytest.raises(ValueError):
+        system.zip_file('junk.txt', codec='rar')
+    assert osp.isfile('junk.txt')
+
+
+def test__unzip_file_not_compressed(tmpdir):
+    tmpdir.chdir()
+    with open('junk.txt', 'w') as f:
+        f.write('Test file')
+    with pytest.raises(ValueError):
+        system.unzip_file('junk.txt')